@@ -5,137 +5,280 @@ from dataclasses import dataclass
 from functools import partial
 from pprint import pprint
 
-import matplotlib.pyplot as plt
 import numpy as np
+from matplotlib.figure import Figure
+from scipy import stats
 
-from scoring import Scoring
+import significance
+from instrument import span
+from answers import Ratings
+from scoring import Scoring, ScoringFrame
 from utils import *
 
 
 class AvgMedian:
-    def __init__(self, desc, with_ai, without):
+    def __init__(self, desc, with_ai, without, ci=None):
         self.desc = desc
+        # statistics.mean is exactly rounded, so the reported numbers don't
+        # depend on the summation order
         self.mean_with_ai = statistics.mean(with_ai)
         self.mean_without = statistics.mean(without)
         self.median_with_ai = statistics.median(with_ai)
         self.median_without = statistics.median(without)
 
+        # Bootstrap confidence intervals, as returned by
+        # significance.bootstrap_ci for this column, if any
+        self.ci = ci
+
     def __str__(self):
-        return (
+        s = (
                 f'       With AI vs. Without\n' +
                 f'Mean   = {self.mean_with_ai:>5.02f}     {self.mean_without:.02f}\n' +
                 f'Median = {self.median_with_ai:>5.02f}     {self.median_without:.02f}'
         )
+        if self.ci:
+            for stat, name in [('mean', 'Mean'), ('median', 'Median')]:
+                ci_a, ci_b, ci_diff = self.ci[stat]
+                s += (
+                    f'\n{name + " CI":<9}= [{ci_a[0]:.02f}, {ci_a[1]:.02f}]  [{ci_b[0]:.02f}, {ci_b[1]:.02f}]'
+                    f'  diff [{ci_diff[0]:.02f}, {ci_diff[1]:.02f}]'
+                )
+        return s
 
     def rows(self):
-        return [
+        rows = [
             [self.desc, 'Gjennomsnitt', fmt_num(self.mean_with_ai), fmt_num(self.mean_without)],
             [self.desc, 'Median', fmt_num(self.median_with_ai), fmt_num(self.median_without)],
         ]
+        if self.ci:
+            for row, stat, diff in [
+                (rows[0], 'mean', self.mean_with_ai - self.mean_without),
+                (rows[1], 'median', self.median_with_ai - self.median_without),
+            ]:
+                ci_a, ci_b, ci_diff = self.ci[stat]
+                row += [
+                    fmt_num(ci_a[0]), fmt_num(ci_a[1]), fmt_num(ci_b[0]), fmt_num(ci_b[1]),
+                    fmt_num(diff), fmt_num(ci_diff[0]), fmt_num(ci_diff[1]),
+                ]
+        return rows
+
+
+# Score columns reported for a scoring, by description.
+CRITERIA = {
+    'Originalitet': lambda f: f.original,
+    'Gjennomførbarhet': lambda f: f.plausible,
+    'Potensiell effekt': lambda f: f.effective,
+    'Total, gjennomsnitt': lambda f: f.total(),
+    'Total, 60/20/20': lambda f: f.total_weighted(.6, .2),
+    'Total, 50/25/25': lambda f: f.total_weighted(.5, .25),
+    'Total, 50/20/30': lambda f: f.total_weighted(.5, .2),
+    'Total, 40/30/30': lambda f: f.total_weighted(.4, .3),
+    'Total, 40/20/40': lambda f: f.total_weighted(.4, .2),
+}
+
+
+def criteria_cis(with_ai: ScoringFrame, without: ScoringFrame, descs) -> dict:
+    """
+    Bootstrap CIs of the given CRITERIA, computed for all of them in one
+    resampling pass. Returns {desc: ci} for AvgMedian.
+    """
+    a = np.column_stack([CRITERIA[desc](with_ai) for desc in descs])
+    b = np.column_stack([CRITERIA[desc](without) for desc in descs])
+    cis = significance.bootstrap_ci(a, b)
+    return {
+        desc: {stat: tuple(ci[:, j] for ci in intervals) for stat, intervals in cis.items()}
+        for j, desc in enumerate(descs)
+    }
+
+
+def scoring_csv(with_ai: Scoring | ScoringFrame, without: Scoring | ScoringFrame, fout=sys.stdout, ci=False):
+    with_ai = ScoringFrame.of(with_ai)
+    without = ScoringFrame.of(without)
+    cis = criteria_cis(with_ai, without, list(CRITERIA)) if ci else {}
 
-
-def scoring_csv(with_ai: Scoring, without: Scoring, fout=sys.stdout):
     w = csv.writer(fout, delimiter=';')
-    w.writerow(['Beskrivelse', 'Type', 'Med KI', 'Uten KI'])
-
-    rows = AvgMedian(
-        desc='Originalitet',
-        with_ai=[s.original for s in with_ai],
-        without=[s.original for s in without],
-    ).rows()
-    w.writerows(rows)
-
-    rows = AvgMedian(
-        desc='Gjennomførbarhet',
-        with_ai=[s.plausible for s in with_ai],
-        without=[s.plausible for s in without],
-    ).rows()
-    w.writerows(rows)
-
-    rows = AvgMedian(
-        desc='Potensiell effekt',
-        with_ai=[s.effective for s in with_ai],
-        without=[s.effective for s in without],
-    ).rows()
-    w.writerows(rows)
-
-    rows = AvgMedian(
-        desc='Total, gjennomsnitt',
-        with_ai=[s.total() for s in with_ai],
-        without=[s.total() for s in without],
-    ).rows()
-    w.writerows(rows)
-
-    rows = AvgMedian(
-        desc='Total, 60/20/20',
-        with_ai=[s.total_weighted(.6, .2) for s in with_ai],
-        without=[s.total_weighted(.6, .2) for s in without],
-    ).rows()
-    w.writerows(rows)
-
-    rows = AvgMedian(
-        desc='Total, 50/25/25',
-        with_ai=[s.total_weighted(.5, .25) for s in with_ai],
-        without=[s.total_weighted(.5, .25) for s in without],
-    ).rows()
-    w.writerows(rows)
-
-    rows = AvgMedian(
-        desc='Total, 50/20/30',
-        with_ai=[s.total_weighted(.5, .2) for s in with_ai],
-        without=[s.total_weighted(.5, .2) for s in without],
-    ).rows()
-    w.writerows(rows)
-
-    rows = AvgMedian(
-        desc='Total, 40/30/30',
-        with_ai=[s.total_weighted(.4, .3) for s in with_ai],
-        without=[s.total_weighted(.4, .3) for s in without],
-    ).rows()
-    w.writerows(rows)
-
-    rows = AvgMedian(
-        desc='Total, 40/20/40',
-        with_ai=[s.total_weighted(.4, .2) for s in with_ai],
-        without=[s.total_weighted(.4, .2) for s in without],
-    ).rows()
-    w.writerows(rows)
-
-
-def scoring_report(with_ai: Scoring, without: Scoring, fout=sys.stdout):
+    header = ['Beskrivelse', 'Type', 'Med KI', 'Uten KI']
+    if ci:
+        header += ['Med KI nedre', 'Med KI øvre', 'Uten KI nedre', 'Uten KI øvre',
+                   'Differanse', 'Differanse nedre', 'Differanse øvre']
+    w.writerow(header)
+
+    for desc, column in CRITERIA.items():
+        rows = AvgMedian(
+            desc=desc,
+            with_ai=column(with_ai),
+            without=column(without),
+            ci=cis.get(desc),
+        ).rows()
+        w.writerows(rows)
+
+
+def scoring_report(with_ai: Scoring | ScoringFrame, without: Scoring | ScoringFrame, fout=sys.stdout, ci=False):
+    with_ai = ScoringFrame.of(with_ai)
+    without = ScoringFrame.of(without)
     show = partial(print, file=fout)
 
-    show('\nOriginalitet')
-    am = AvgMedian(
-        desc='Originalitet',
-        with_ai=[s.original for s in with_ai],
-        without=[s.original for s in without],
-    )
-    show(am)
-
-    show('\nGjennomførbarhet')
-    am = AvgMedian(
-        desc='Gjennomførbarhet',
-        with_ai=[s.plausible for s in with_ai],
-        without=[s.plausible for s in without],
-    )
-    show(am)
-
-    show('\nPotensiell effekt')
-    am = AvgMedian(
-        desc='Potensiell effekt',
-        with_ai=[s.effective for s in with_ai],
-        without=[s.effective for s in without],
-    )
-    show(am)
-
-    show('\nTotal, 60/20/20')
-    am = AvgMedian(
-        desc='Total, 60/20/20',
-        with_ai=[s.total_weighted(.6, .2) for s in with_ai],
-        without=[s.total_weighted(.6, .2) for s in without],
-    )
-    show(am)
+    descs = ['Originalitet', 'Gjennomførbarhet', 'Potensiell effekt', 'Total, 60/20/20']
+    cis = criteria_cis(with_ai, without, descs) if ci else {}
+
+    for desc in descs:
+        show(f'\n{desc}')
+        am = AvgMedian(
+            desc=desc,
+            with_ai=CRITERIA[desc](with_ai),
+            without=CRITERIA[desc](without),
+            ci=cis.get(desc),
+        )
+        show(am)
+
+
+class WeightSweep:
+    """
+    AI vs. non-AI comparison of the weighted total over a grid of
+    (originality, plausibility) weights, with the effect weighted by the
+    remainder. The weightings are evaluated `batch` at a time as matrix
+    products, which bounds memory to about batch × ideas values.
+    """
+
+    def __init__(self, with_ai: Scoring | ScoringFrame, without: Scoring | ScoringFrame, step=0.01, batch=256):
+        steps = np.round(np.arange(0, 1 + step / 2, step), 10)
+        wo, wp = np.meshgrid(steps, steps, indexing='ij')
+        self.steps = steps
+        self.valid = wo + wp <= 1 + 1e-9
+        self.wo = wo[self.valid]
+        self.wp = wp[self.valid]
+        self.we = np.clip(1 - self.wo - self.wp, 0, 1)
+
+        # criterion × weighting
+        weights = np.stack([self.wo, self.wp, self.we])
+        criteria_a = ScoringFrame.of(with_ai).criteria()
+        criteria_b = ScoringFrame.of(without).criteria()
+
+        self.mean_with_ai, self.mean_without = np.empty(len(self)), np.empty(len(self))
+        self.median_with_ai, self.median_without = np.empty(len(self)), np.empty(len(self))
+        self.pvalue = np.empty(len(self))
+        for start in range(0, len(self), batch):
+            chunk = slice(start, start + batch)
+            # weighting × idea, so the medians run along contiguous rows
+            a = weights[:, chunk].T @ criteria_a.T
+            b = weights[:, chunk].T @ criteria_b.T
+            self.mean_with_ai[chunk] = a.mean(axis=1)
+            self.mean_without[chunk] = b.mean(axis=1)
+            self.median_with_ai[chunk] = np.median(a, axis=1)
+            self.median_without[chunk] = np.median(b, axis=1)
+            self.pvalue[chunk] = stats.ttest_ind(a, b, axis=1).pvalue
+
+    def __len__(self):
+        return len(self.wo)
+
+    def grid(self, values):
+        """Weighting values as an originality × plausibility grid, NaN where invalid."""
+        res = np.full(self.valid.shape, np.nan)
+        res[self.valid] = values
+        return res
+
+    def csv(self, fout=sys.stdout):
+        w = csv.writer(fout, delimiter=';')
+        w.writerow([
+            'Originalitet', 'Gjennomførbarhet', 'Potensiell effekt',
+            'Gjennomsnitt med KI', 'Gjennomsnitt uten KI', 'Median med KI', 'Median uten KI', 'P-verdi',
+        ])
+        for i in range(len(self)):
+            w.writerow([
+                fmt_num(self.wo[i]), fmt_num(self.wp[i]), fmt_num(self.we[i]),
+                fmt_num(self.mean_with_ai[i]), fmt_num(self.mean_without[i]),
+                fmt_num(self.median_with_ai[i]), fmt_num(self.median_without[i]),
+                fmt_num(self.pvalue[i], w=4),
+            ])
+
+    def heatmap(self, name, title, figsize=(14, 6)):
+        fig = Figure(figsize=figsize)
+        ax_diff, ax_p = fig.subplots(1, 2)
+        extent = [self.steps[0], self.steps[-1], self.steps[0], self.steps[-1]]
+
+        for ax, values, label, cmap in [
+            (ax_diff, self.mean_with_ai - self.mean_without, 'Differanse gjennomsnitt (med - uten KI)', 'coolwarm'),
+            (ax_p, self.pvalue, 'P-verdi', 'viridis_r'),
+        ]:
+            # Plausibility on the x axis, originality on the y axis
+            im = ax.imshow(self.grid(values), origin='lower', extent=extent, cmap=cmap, aspect='auto')
+            fig.colorbar(im, ax=ax, label=label)
+            ax.set_xlabel('Vekt gjennomførbarhet')
+            ax.set_ylabel('Vekt originalitet')
+
+        ax_p.contour(self.steps, self.steps, self.grid(self.pvalue), levels=[0.05], colors='red')
+        fig.suptitle(title)
+        fig.tight_layout()
+
+        save_figure(fig, name)
+
+
+# Upper part of the answers kept by each split rule, as a fraction.
+# A plain float is also accepted as a split.
+SPLITS = {
+    'median': 1 / 2,
+    'tercile': 1 / 3,
+    'quartile': 1 / 4,
+}
+
+
+@dataclass
+class SplitTest:
+    attribute: str
+    split: str | float
+    n_with_ai: int
+    n_without: int
+    statistic: float
+    pvalue: float
+    # Effect sizes of with AI - without, as significance.effect_sizes
+    effects: dict
+
+
+def split_tests(
+        with_ai: Scoring | ScoringFrame,
+        without: Scoring | ScoringFrame,
+        ratings: Ratings,
+        attributes: list[str],
+        splits=('median',),
+        test=stats.ttest_ind,
+) -> list[SplitTest]:
+    """
+    Compare the totals of the AI and non-AI answers ranked highest on
+    each of the ordinal answer `attributes` (e.g. 'ai_knowledge'), with
+    codes from `ratings`.
+
+    Answers are ranked by attribute, ties by total score, ties by number.
+    Each group gets a single argsort over all attributes, and every split
+    tests all attributes with one call of `test` on the score columns.
+    """
+    with_ai = ScoringFrame.of(with_ai)
+    without = ScoringFrame.of(without)
+
+    ranked = []
+    for frame in (with_ai, without):
+        total = frame.total()
+        codes = np.column_stack([ratings.codes(attr, frame.position) for attr in attributes]).astype(np.int64)
+        total_rank = np.argsort(np.argsort(total, kind='stable'), kind='stable')
+        order = np.argsort(codes * len(total) + total_rank[:, np.newaxis], axis=0)
+        ranked.append(total[order])
+
+    res = []
+    for split in splits:
+        keep = SPLITS.get(split, split)
+        a, b = [r[int(len(r) * (1 - keep)):] for r in ranked]
+        result = test(a, b)
+        effects = significance.effect_sizes(a, b)
+        for j, attr in enumerate(attributes):
+            res.append(SplitTest(
+                attribute=attr,
+                split=split,
+                n_with_ai=len(a),
+                n_without=len(b),
+                statistic=float(np.atleast_1d(result.statistic)[j]),
+                pvalue=float(np.atleast_1d(result.pvalue)[j]),
+                effects={e: tuple(float(v[j]) for v in values) for e, values in effects.items()},
+            ))
+    return res
 
 
 @dataclass
@@ -157,27 +300,25 @@ def bar_plot_single(
         figsize=(12, 8),
         bar_width=0.35
 ):
-    plt.figure(figsize=figsize)
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
     x = list(range(len(values)))
 
     # Grid lines
-    plt.grid(True, axis='y', alpha=0.3, linestyle='-', linewidth=0.5)
+    ax.grid(True, axis='y', alpha=0.3, linestyle='-', linewidth=0.5)
 
     # Create bars
-    plt.bar([i for i in x], values, width=bar_width, label=label)
+    ax.bar([i for i in x], values, width=bar_width, label=label)
 
     # Add labels, title and legend
-    plt.xlabel(xlabel)
-    plt.ylabel(ylabel)
-    plt.title(title)
-    plt.xticks(x, xticklabels, rotation=rotation)
-    plt.legend()
-    plt.tight_layout()
-
-    # Write to file
-    fout = outdir / f'{name}.png'
-    plt.savefig(fout)
-    debug(f'Wrote graph: {name}')
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    ax.set_xticks(x, xticklabels, rotation=rotation)
+    ax.legend()
+    fig.tight_layout()
+
+    save_figure(fig, name)
 
 
 def bar_plot_compare_ai(
@@ -192,25 +333,23 @@ def bar_plot_compare_ai(
         figsize=(12, 8),
         bar_width=0.35
 ):
-    plt.figure(figsize=figsize)
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
     x = list(range(len(values_with_ai)))
 
     # Create bars
-    plt.bar([i - bar_width / 2 for i in x], values_with_ai, width=bar_width, label='With AI')
-    plt.bar([i + bar_width / 2 for i in x], values_without, width=bar_width, label='Without AI')
+    ax.bar([i - bar_width / 2 for i in x], values_with_ai, width=bar_width, label='With AI')
+    ax.bar([i + bar_width / 2 for i in x], values_without, width=bar_width, label='Without AI')
 
     # Add labels, title and legend
-    plt.xlabel(xlabel)
-    plt.ylabel(ylabel)
-    plt.title(title)
-    plt.xticks(x, xticklabels, rotation=rotation)
-    plt.legend()
-    plt.tight_layout()
-
-    # Write to file
-    fout = outdir / f'{name}.png'
-    plt.savefig(fout)
-    debug(f'Wrote graph: {name}')
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    ax.set_xticks(x, xticklabels, rotation=rotation)
+    ax.legend()
+    fig.tight_layout()
+
+    save_figure(fig, name)
 
 
 def scatter_plot(
@@ -225,7 +364,8 @@ def scatter_plot(
         figsize=(12, 8),
         marker_size=8
 ):
-    plt.figure(figsize=figsize)
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
     x = list(range(len(line_values[0])))
 
     # Create scatter plots for each line
@@ -234,18 +374,31 @@ def scatter_plot(
     for i, values in enumerate(line_values):
         marker = markers[i % len(markers)]
         label = line_labels[i] if i < len(line_labels) else f'Series {i + 1}'
-        plt.scatter(x, values, label=label, s=marker_size * 10, marker=marker, alpha=0.7)
+        ax.scatter(x, values, label=label, s=marker_size * 10, marker=marker, alpha=0.7)
 
     # Add labels, title and legend
-    plt.xlabel(xlabel)
-    plt.ylabel(ylabel)
-    plt.title(title)
-    plt.xticks(x, xticklabels, rotation=rotation)
-    plt.legend()
-    plt.grid(True, linestyle='--', alpha=0.3)
-    plt.tight_layout()
-
-    # Write to file
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    ax.set_xticks(x, xticklabels, rotation=rotation)
+    ax.legend()
+    ax.grid(True, linestyle='--', alpha=0.3)
+    fig.tight_layout()
+
+    save_figure(fig, name)
+
+
+def save_figure(fig: Figure, name):
+    """
+    Write the figure to the out folder and release it.
+
+    Figures are created directly rather than through pyplot, so no global
+    state holds on to them and rendering uses the non-interactive Agg
+    canvas.
+    """
     fout = outdir / f'{name}.png'
-    plt.savefig(fout)
+    with span(f'plot {name}'):
+        fig.savefig(fout)
+    fig.clear()
     debug(f'Wrote graph: {name}')
+
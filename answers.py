@@ -16,18 +16,70 @@ def float_no(s):
         return 0.0
 
 
+def parse_date(s):
+    return arrow.get(s, 'M/D/YY H:mm')
+
+
+def parse_usages(s):
+    return s.split(',') if s else s
+
+
+class Parsed:
+    """
+    Answer field kept as its raw CSV string until first accessed, and
+    then replaced by the parsed value.
+    """
+
+    def __init__(self, parse):
+        self.parse = parse
+
+    def __set_name__(self, owner, name):
+        self.slot = f'_{name}'
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        value = getattr(obj, self.slot)
+        if isinstance(value, str):
+            value = self.parse(value)
+            setattr(obj, self.slot, value)
+        return value
+
+    def __set__(self, obj, value):
+        setattr(obj, self.slot, value)
+
+
 class Answer:
-    def __init__(self, row):
-        self.row = row
+    __slots__ = (
+        '_start_date', '_end_date', 'progress_percent', 'duration_seconds', 'finished',
+        '_recorded_date', 'id', 'idea1', 'idea2', 'idea3', 'idea4', 'idea5', 'difficulty',
+        '_time_brainstorm', '_time_description', '_time_effect', '_ans_usages', 'work_usage',
+        'ai_use_exploration', 'ai_use_videreutvikling', 'ai_use_search', 'ai_time_saved',
+        'ai_quality', 'ai_critical', 'ai_knowledge', 'ai_education', 'age', 'experience', 'sex',
+        'department', 'education_level', 'role', 'original', 'plausible', 'effective', 'used_ai',
+        'position', '_number', '_category', '_ideas',
+    )
+
+    start_date = Parsed(parse_date)
+    end_date = Parsed(parse_date)
+    recorded_date = Parsed(parse_date)
+
+    time_brainstorm = Parsed(float_no)
+    time_description = Parsed(float_no)
+    time_effect = Parsed(float_no)
+
+    # How they used AI when answering
+    ans_usages = Parsed(parse_usages)
 
+    def __init__(self, row):
         assert len(row) == 104, f'Expected 104 columns in answers, got {len(row)}'
 
-        self.start_date = arrow.get(row[0], 'M/D/YY H:mm')
-        self.end_date = arrow.get(row[1], 'M/D/YY H:mm')
+        self.start_date = row[0]
+        self.end_date = row[1]
         self.progress_percent = int(row[4])
         self.duration_seconds = int(row[5])
         self.finished = bool(row[6])
-        self.recorded_date = arrow.get(row[7], 'M/D/YY H:mm')
+        self.recorded_date = row[7]
         self.id = row[8]
 
         self.idea1 = row[19] or row[53]
@@ -38,15 +90,11 @@ class Answer:
 
         self.difficulty = row[44] or row[78]
 
-        self.time_brainstorm = float_no(row[26] or row[60])
-        self.time_description = float_no(row[32] or row[66])
-        self.time_effect = float_no(row[39] or row[73])
-        self.time_total = self.time_brainstorm + self.time_description + self.time_effect
+        self.time_brainstorm = row[26] or row[60]
+        self.time_description = row[32] or row[66]
+        self.time_effect = row[39] or row[73]
 
-        # How they used AI when answering
         self.ans_usages = row[46] or row[79]
-        if self.ans_usages:
-            self.ans_usages = self.ans_usages.split(',')
 
         # How much they use AI at work
         self.work_usage = row[83]
@@ -78,10 +126,49 @@ class Answer:
 
         self.used_ai = row[-1] == 'AI'
 
+        # Index in the list of all answers, if read with it
+        self.position = -1
+
         self._number = None
         self._category = None
         self._ideas = None
 
+    # Order of the values given to from_values()
+    FIELDS = (
+        'start_date', 'end_date', 'progress_percent', 'duration_seconds', 'finished',
+        'recorded_date', 'id', 'idea1', 'idea2', 'idea3', 'idea4', 'idea5', 'difficulty',
+        'time_brainstorm', 'time_description', 'time_effect', 'ans_usages', 'work_usage',
+        'ai_use_exploration', 'ai_use_videreutvikling', 'ai_use_search', 'ai_time_saved',
+        'ai_quality', 'ai_critical', 'ai_knowledge', 'ai_education', 'age', 'experience', 'sex',
+        'department', 'education_level', 'role', 'original', 'plausible', 'effective', 'used_ai',
+    )
+
+    @classmethod
+    def from_values(cls, values, position=-1) -> 'Answer':
+        """
+        Create an answer from already extracted field values, ordered as
+        `FIELDS`, bypassing the row parsing. Used by the column-wise loader.
+        """
+        ans = cls.__new__(cls)
+        (
+            ans._start_date, ans._end_date, ans.progress_percent, ans.duration_seconds, ans.finished,
+            ans._recorded_date, ans.id, ans.idea1, ans.idea2, ans.idea3, ans.idea4, ans.idea5,
+            ans.difficulty, ans._time_brainstorm, ans._time_description, ans._time_effect,
+            ans._ans_usages, ans.work_usage, ans.ai_use_exploration, ans.ai_use_videreutvikling,
+            ans.ai_use_search, ans.ai_time_saved, ans.ai_quality, ans.ai_critical, ans.ai_knowledge,
+            ans.ai_education, ans.age, ans.experience, ans.sex, ans.department, ans.education_level,
+            ans.role, ans.original, ans.plausible, ans.effective, ans.used_ai,
+        ) = values
+        ans.position = position
+        ans._number = None
+        ans._category = None
+        ans._ideas = None
+        return ans
+
+    @property
+    def time_total(self):
+        return self.time_brainstorm + self.time_description + self.time_effect
+
     @property
     def number(self):
         if self._number is None:
@@ -123,85 +210,307 @@ class Answer:
 
     @property
     def ai_knowledge_rated(self):
-        rating_map = {
-            'Ingen kunnskap': 0,
-            'Litt kunnskap': 1,
-            'Moderat kunnskap': 2,
-            'God kunnskap': 3,
-            'Svært god kunnskap': 4
-        }
-        return rating_map[self.ai_knowledge]
+        return SCALES['ai_knowledge'][self.ai_knowledge]
 
     @property
     def ai_critical_rated(self):
-        rating_map = {
-            '': 0,
-            'I ingen grad': 1,
-            'I liten grad': 1,
-            'I middels grad': 2,
-            'I stor grad': 3,
-            'I svært stor grad': 4
-        }
-        return rating_map[self.ai_critical]
+        return SCALES['ai_critical'][self.ai_critical]
 
     @property
     def work_usage_rated(self):
-        rating_map = {
-            '': 0,
-            'I ingen grad': 1,
-            'I liten grad': 1,
-            'I middels grad': 2,
-            'I stor grad': 3,
-            'I svært stor grad': 4
-        }
-        return rating_map[self.work_usage]
-
-    ai_use_rating_map = {
-        '': 0,
-        '1 - ingen grad': 1,
-        '2 - liten grad': 2,
-        '3 - middels grad': 3,
-        '4 - stor grad': 4,
-        '5 - Veldig stor grad': 5
-    }
+        return SCALES['work_usage'][self.work_usage]
 
     @property
     def ai_use_exploration_rated(self):
-        return self.ai_use_rating_map[self.ai_use_exploration]
+        return SCALES['ai_use_exploration'][self.ai_use_exploration]
 
     @property
     def ai_use_videreutvikling_rated(self):
-        return self.ai_use_rating_map[self.ai_use_videreutvikling]
+        return SCALES['ai_use_videreutvikling'][self.ai_use_videreutvikling]
 
     @property
     def ai_use_search_rated(self):
-        return self.ai_use_rating_map[self.ai_use_search]
+        return SCALES['ai_use_search'][self.ai_use_search]
+
+    @property
+    def difficulty_rated(self):
+        return SCALES['difficulty'][self.difficulty]
+
+
+class Ratings:
+    """
+    The Likert-style answer fields of a list of answers, encoded once as
+    int8 code arrays. Codes are ordered as the levels of `SCALES`, and
+    values outside the scale are stored as -1.
+    """
+
+    def __init__(self, answers: Iterable[Answer]):
+        import numpy as np
+        import pandas as pd
+
+        answers = list(answers)
+        self._codes = {}
+        for field, scale in SCALES.items():
+            values = pd.Series([getattr(ans, field) for ans in answers], dtype=object)
+            self._codes[field] = values.map(scale).fillna(-1).to_numpy(np.int8)
+
+    def __len__(self):
+        return len(next(iter(self._codes.values()), ()))
+
+    def codes(self, field, positions=None):
+        """
+        Codes of `field`, for all answers or the answers at `positions`.
+        Fails if any of them isn't on the scale, or if a position isn't one
+        of the encoded answers, as for answers not read with a position.
+        """
+        import numpy as np
+
+        codes = self._codes[field]
+        if positions is not None:
+            positions = np.asarray(positions, dtype=np.int64)
+            outside = (positions < 0) | (positions >= len(codes))
+            if outside.any():
+                raise IndexError(f'{outside.sum()} answers have positions outside the {len(codes)} encoded answers')
+            codes = codes[positions]
+        if (codes < 0).any():
+            raise KeyError(f'{(codes < 0).sum()} answers have {field} values outside the scale')
+        return codes
+
+    def categorical(self, field, positions=None):
+        """The codes of `field` as an ordered pandas Categorical."""
+        import pandas as pd
+
+        levels = sorted(set(SCALES[field].values()))
+        return pd.Categorical(self.codes(field, positions), categories=levels, ordered=True)
+
+
+# Scale of the "I ... grad" questions
+DEGREE_SCALE = {
+    '': 0,
+    'I ingen grad': 1,
+    'I liten grad': 1,
+    'I middels grad': 2,
+    'I stor grad': 3,
+    'I svært stor grad': 4
+}
+
+# Scale of the questions on how AI is used
+AI_USE_SCALE = {
+    '': 0,
+    '1 - ingen grad': 1,
+    '2 - liten grad': 2,
+    '3 - middels grad': 3,
+    '4 - stor grad': 4,
+    '5 - Veldig stor grad': 5
+}
+
+# Ordinal answer fields, mapping each level to its code
+SCALES = {
+    'ai_knowledge': {
+        'Ingen kunnskap': 0,
+        'Litt kunnskap': 1,
+        'Moderat kunnskap': 2,
+        'God kunnskap': 3,
+        'Svært god kunnskap': 4
+    },
+    'ai_critical': DEGREE_SCALE,
+    'work_usage': DEGREE_SCALE,
+    'ai_use_exploration': AI_USE_SCALE,
+    'ai_use_videreutvikling': AI_USE_SCALE,
+    'ai_use_search': AI_USE_SCALE,
+    'difficulty': {
+        'Svært lett': 1,
+        'Lett': 2,
+        'Middels': 3,
+        'Vanskelig': 4,
+        'Svært vanskelig': 5,
+    },
+}
+
+
+class IdeaIndex(dict):
+    """
+    Index of answers keyed by the text of their first idea.
+
+    Idea texts shared by more than one answer are ambiguous; they are kept
+    out of the index and looking them up fails.
+    """
+
+    def __init__(self, answers: Iterable[Answer]):
+        super().__init__()
+        self.ambiguous = set()
+
+        for ans in answers:
+            if ans.idea1 in self.ambiguous:
+                continue
+            if ans.idea1 in self:
+                del self[ans.idea1]
+                self.ambiguous.add(ans.idea1)
+                continue
+            self[ans.idea1] = ans
+
+        if self.ambiguous:
+            debug(f'Ambiguous idea texts in answers: {len(self.ambiguous)}')
 
 
 def categorize(answers: Iterable[Answer], categories: Categories) -> list[Answer]:
     """
     Use the `categories` to categorize all the given answers.
 
-    If an answer isn't categorized, this will fail.
+    If any answers aren't categorized, this will fail with a KeyError
+    listing all of them.
     """
-    return [ans.categorized(categories[ans.id]) for ans in answers]
+    res = []
+    missing = []
+    for ans in answers:
+        entry = categories.get(ans.id)
+        if entry is None:
+            missing.append(ans.id)
+        else:
+            res.append(ans.categorized(entry))
 
+    if missing:
+        raise KeyError(f'{len(missing)} answers not categorized: {", ".join(missing)}')
+    return res
 
-def read_answers() -> list[Answer]:
+
+def read_answers(ids=None, ideas=None, chunksize=None) -> list[Answer]:
     """
-    Read all answers from the CSV file in the data folder.
+    Read the answers from the CSV file in the data folder, optionally only
+    those matching `ids` or `ideas` (see read_answer_columns()).
+
+    The file is parsed column-wise, and the answers are built from the
+    parsed columns.
     """
+    res = answers_from_columns(read_answer_columns(ids, ideas, chunksize))
+    debug(f'Read {len(res)} answers from {F_ANSWERS}')
+    return res
 
-    with open(F_ANSWERS, 'r', encoding='utf-8') as f:
-        rd = csv.reader(f, delimiter=';')
 
-        # Skip the first two rows
-        next(rd)
-        next(rd)
+def answers_from_columns(columns: dict[str, list]) -> list[Answer]:
+    rows = zip(*(columns[name] for name in Answer.FIELDS))
+    return [Answer.from_values(values, i) for i, values in enumerate(rows)]
 
-        res = [Answer(row) for row in rd]
-        debug(f'Read {len(res)} answers from {F_ANSWERS}')
-        return res
+
+# Rows of the answers file parsed at a time
+CHUNK_ROWS = 50_000
+
+
+def read_answer_columns(ids=None, ideas=None, chunksize=None) -> dict[str, list]:
+    """
+    Read the answers CSV file into one list of values per Answer field.
+
+    The file is streamed `chunksize` rows at a time. If `ids` (response
+    ids) or `ideas` (first idea texts) are given, only the rows matching
+    either are kept from each chunk, so memory is bounded by the chunk
+    size and the matching answers rather than the size of the file.
+    """
+    import pandas as pd
+
+    with open(F_ANSWERS, 'r', encoding='utf-8') as f:
+        width = len(next(csv.reader(f, delimiter=';')))
+    assert width == 104, f'Expected 104 columns in answers, got {width}'
+
+    reader = pd.read_csv(
+        F_ANSWERS,
+        sep=';',
+        header=None,
+        skiprows=2,  # Skip the first two rows
+        usecols=ANSWER_COLUMNS,
+        dtype=object,
+        keep_default_na=False,
+        encoding='utf-8',
+        chunksize=chunksize or CHUNK_ROWS,
+    )
+
+    columns = {name: [] for name in Answer.FIELDS}
+    with reader:
+        for chunk in reader:
+            if ids is not None or ideas is not None:
+                chunk = chunk[matching(chunk, ids, ideas)]
+            for name, values in answer_columns(chunk).items():
+                columns[name] += values
+    return columns
+
+
+def matching(df, ids=None, ideas=None):
+    """Mask of the raw answer rows with one of the response `ids` or first `ideas`."""
+    import numpy as np
+
+    keep = np.zeros(len(df), dtype=bool)
+    if ids is not None:
+        keep |= df[8].isin(ids)
+    if ideas is not None:
+        keep |= df[19].where(df[19] != '', df[53]).isin(ideas)
+    return keep
+
+
+# Columns of the answers file used by answer_columns()
+ANSWER_COLUMNS = [
+    0, 1, 4, 5, 6, 7, 8, 19, 20, 21, 22, 23, 26, 32, 39, 41, 42, 43, 44, 46,
+    53, 54, 55, 56, 57, 60, 66, 73, 75, 76, 77, 78, 79, 83, 86, 87, 88,
+    91, 92, 93, 95, 96, 97, 98, 99, 100, 101, 102, 103,
+]
+
+
+def answer_columns(df) -> dict[str, list]:
+    """
+    Extract the Answer fields from a pandas frame of raw answer rows, as
+    one list of values per field.
+    """
+    import numpy as np
+    import pandas as pd
+
+    def coalesce(a, b):
+        return df[a].where(df[a] != '', df[b])
+
+    def timings(a, b):
+        num = pd.to_numeric(coalesce(a, b).str.replace(',', '.'), errors='coerce')
+        return num.fillna(0.0).tolist()
+
+    scores = [pd.to_numeric(coalesce(a, b), errors='coerce') for a, b in [(41, 75), (42, 76), (43, 77)]]
+    invalid = np.logical_or.reduce([s.isna() | (s % 1 != 0) for s in scores])
+    original, plausible, effective = [s.where(~invalid, 0).astype(int).tolist() for s in scores]
+
+    return {
+        # Dates are left raw, Answer parses them on first access
+        'start_date': df[0].tolist(),
+        'end_date': df[1].tolist(),
+        'progress_percent': df[4].astype(int).tolist(),
+        'duration_seconds': df[5].astype(int).tolist(),
+        'finished': (df[6] != '').tolist(),
+        'recorded_date': df[7].tolist(),
+        'id': df[8].tolist(),
+        'idea1': coalesce(19, 53).tolist(),
+        'idea2': coalesce(20, 54).tolist(),
+        'idea3': coalesce(21, 55).tolist(),
+        'idea4': coalesce(22, 56).tolist(),
+        'idea5': coalesce(23, 57).tolist(),
+        'difficulty': coalesce(44, 78).tolist(),
+        'time_brainstorm': timings(26, 60),
+        'time_description': timings(32, 66),
+        'time_effect': timings(39, 73),
+        'ans_usages': coalesce(46, 79).tolist(),
+        'work_usage': df[83].tolist(),
+        'ai_use_exploration': df[86].tolist(),
+        'ai_use_videreutvikling': df[87].tolist(),
+        'ai_use_search': df[88].tolist(),
+        'ai_time_saved': df[91].tolist(),
+        'ai_quality': df[92].tolist(),
+        'ai_critical': df[93].tolist(),
+        'ai_knowledge': df[95].tolist(),
+        'ai_education': df[96].tolist(),
+        'age': df[97].tolist(),
+        'experience': df[98].tolist(),
+        'sex': df[99].tolist(),
+        'department': df[100].tolist(),
+        'education_level': df[101].tolist(),
+        'role': df[102].tolist(),
+        'original': original,
+        'plausible': plausible,
+        'effective': effective,
+        'used_ai': (df[103] == 'AI').tolist(),
+    }
 
 
 def distinct(answers: Iterable[Answer], getkey) -> list:
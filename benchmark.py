@@ -0,0 +1,140 @@
+import contextlib
+import json
+import shutil
+import statistics
+import subprocess
+import time
+from pathlib import Path
+
+import answers
+import cache
+import extra
+import instrument
+import report
+import synthetic
+from instrument import span
+from scoring import Scoring, read_scorings, scored_ideas
+from utils import *
+
+# Benchmark results, one JSON record per line
+F_RESULTS = Path('.benchmarks/results.jsonl')
+
+
+def revision() -> str | None:
+    """Git revision of the code being benchmarked, marked if it has local changes."""
+    here = Path(__file__).parent
+    try:
+        rev = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=here,
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=here,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f'{rev}-dirty' if dirty else rev
+
+
+def run_stages():
+    """Run each pipeline stage once, in a span of its own."""
+    with span('read_answers'):
+        answers.read_answers()
+    with span('read_answers_scored'):
+        scored = answers.read_answers(ideas=scored_ideas())
+    with span('read_scorings'):
+        scorings = read_scorings(scored)
+
+    raters = sorted(name for name in scorings if name != report.CONSENSUS)
+    with span('from_median'):
+        Scoring.from_median([scorings[r] for r in raters])
+    with span('from_mean'):
+        Scoring.from_mean([scorings[r] for r in raters])
+
+    with span('categorize'):
+        answers.categorize(next(iter(scorings.values())).answers(), extra.read_categories())
+
+    # The cache is removed before each run, so this is a cold load
+    with span('load_dataset'):
+        data = report.Data()
+
+    # The t-test section compares the report's own scorer groups
+    if all(r in scorings for r in report.GROUPS['total'] + [report.CONSENSUS]):
+        with span('ttests'):
+            report.ttests(data)
+
+
+def benchmark(root, repeat=3) -> dict:
+    """
+    Time the pipeline stages on the dataset in `root`, `repeat` times,
+    then once more with memory traced for the peak of each stage.
+    """
+    root = Path(root)
+    (root / outdir).mkdir(exist_ok=True)
+    manifest = root / synthetic.F_MANIFEST
+    params = json.loads(manifest.read_text()) if manifest.exists() else {}
+
+    runs = []
+    with contextlib.chdir(root):
+        for i in range(repeat + 1):
+            shutil.rmtree(cache.D_CACHE, ignore_errors=True)
+            if i == repeat:
+                instrument.trace_memory()
+            run_stages()
+            runs.append({s.name: s for s in instrument.take_spans()})
+
+    timed, traced = runs[:-1], runs[-1]
+    stages = {}
+    for name, s in traced.items():
+        stages[name] = {
+            'parent': s.parent,
+            'wall': statistics.median(r[name].wall for r in timed),
+            'wall_min': min(r[name].wall for r in timed),
+            'cpu': statistics.median(r[name].cpu for r in timed),
+            'peak': s.peak,
+        }
+
+    return {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'revision': revision(),
+        'root': str(root),
+        'params': params,
+        'repeat': repeat,
+        'stages': stages,
+    }
+
+
+def record(result, path=F_RESULTS):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'a') as f:
+        f.write(json.dumps(result, ensure_ascii=False) + '\n')
+    debug(f'Recorded benchmark: {path}')
+
+
+def previous(result, path=F_RESULTS) -> dict | None:
+    """The latest recorded result of another revision, on a dataset of the same parameters."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    res = None
+    with open(path) as f:
+        for line in f:
+            other = json.loads(line)
+            if other['params'] == result['params'] and other['revision'] != result['revision']:
+                res = other
+    return res
+
+
+def report_table(result, before=None):
+    """
+    Print the top-level stages of a result, compared to an earlier result
+    if given. Inner spans are only recorded.
+    """
+    if before:
+        echo(f'Compared to {before["revision"]} at {before["time"]}')
+    for name, stage in result['stages'].items():
+        if stage['parent']:
+            continue
+        line = f'{name:<20} {stage["wall"]:>9.3f} s  {stage["cpu"]:>9.3f} s CPU  {stage["peak"] / 2 ** 20:>8.1f} MiB'
+        old = before['stages'].get(name) if before else None
+        if old:
+            line += f'  {stage["wall"] / old["wall"]:>6.2f}× ({old["wall"]:.3f} s)'
+        echo(line)
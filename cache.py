@@ -0,0 +1,218 @@
+import hashlib
+import os
+from pathlib import Path
+
+import numpy as np
+
+import answers
+import extra
+from answers import Answer, IdeaIndex
+from extra import Categories
+from instrument import span
+from scoring import D_SCORING, Scoring, ScoringEntry, read_scoring, scored_ideas
+from utils import debug, warn
+
+D_CACHE = Path('.cache')
+# Columns of the scored answers, by the answers file and the scored ideas
+F_ANSWERS_CACHE = D_CACHE / 'answers.npz'
+# Categories and scorings, by the digests of their files
+F_DATASET = D_CACHE / 'dataset.npz'
+
+# Bump when the layout or content of the cache files changes
+VERSION = 3
+
+# Separator of the strings in a packed string column
+SEP = '\0'
+
+# Digests of the input files, with the (mtime, size) they were taken at
+_digests: dict[Path, tuple[tuple[int, int], str]] = {}
+
+
+def input_files() -> list[Path]:
+    return [answers.F_ANSWERS, extra.F_CATEGORIES, *sorted(D_SCORING.glob('*.csv'))]
+
+
+def file_digest(path) -> str:
+    """
+    Hash of the content of a file. The file is only read again when its
+    modification time or size changed since it was last hashed.
+    """
+    path = Path(path)
+    st = path.stat()
+    stat = (st.st_mtime_ns, st.st_size)
+    known = _digests.get(path)
+    if known is None or known[0] != stat:
+        with open(path, 'rb') as f:
+            known = (stat, hashlib.file_digest(f, 'sha256').hexdigest())
+        _digests[path] = known
+    return known[1]
+
+
+def fingerprint(*parts) -> str:
+    """Hash of the cache version and the given parts."""
+    h = hashlib.sha256(f'v{VERSION}'.encode())
+    for part in parts:
+        h.update(f'{part}{SEP}'.encode())
+    return h.hexdigest()
+
+
+def pack(values: list) -> np.ndarray:
+    """
+    Turn a column of values into an array. Strings are stored as one
+    UTF-8 buffer, separated by NUL.
+    """
+    if values and all(isinstance(v, str) for v in values):
+        joined = SEP.join(values)
+        if joined.count(SEP) != len(values) - 1:
+            raise ValueError('Cannot cache strings containing NUL')
+        return np.frombuffer(joined.encode('utf-8'), dtype=np.uint8)
+    return np.asarray(values)
+
+
+def unpack(arr: np.ndarray) -> list:
+    if arr.dtype == np.uint8:
+        return arr.tobytes().decode('utf-8').split(SEP)
+    return arr.tolist()
+
+
+def read_npz(path) -> dict:
+    """The arrays of a cache file, or none if it's missing, unreadable or outdated."""
+    if not path.exists():
+        return {}
+    try:
+        with np.load(path) as npz:
+            if 'version' not in npz.files or int(npz['version']) != VERSION:
+                return {}
+            return {name: npz[name] for name in npz.files}
+    except Exception as e:
+        warn(f'Ignoring unreadable cache {path}: {e}')
+        return {}
+
+
+def write_npz(path, arrays):
+    try:
+        D_CACHE.mkdir(exist_ok=True)
+        tmp = path.with_suffix('.tmp.npz')
+        np.savez(tmp, version=np.array(VERSION), **arrays)
+        os.replace(tmp, path)
+        debug(f'Wrote cache: {path}')
+    except (OSError, ValueError) as e:
+        warn(f'Could not write cache {path}: {e}')
+
+
+def load_dataset():
+    """
+    Read answers, categories and all scorings. Each is read from the
+    on-disk cache when its files haven't changed since it was written, so
+    editing a scoring file only reads that file again.
+
+    Returns a tuple of (answers, categories, scorings). Only the answers
+    with a scored idea are read.
+    """
+    with span('read cache'):
+        cached = read_npz(F_DATASET)
+        # Files with an unchanged mtime and size aren't hashed again
+        for path, stat, digest in zip(
+                unpack(cached.get('files/path', np.array([]))),
+                cached.get('files/stat', np.zeros((0, 2), dtype=np.int64)).tolist(),
+                unpack(cached.get('files/digest', np.array([]))),
+        ):
+            _digests.setdefault(Path(path), (tuple(stat), digest))
+
+    with span('fingerprint inputs'):
+        ideas = scored_ideas()
+        answers_key = fingerprint(file_digest(answers.F_ANSWERS), *sorted(ideas))
+
+    with span('load answers'):
+        all_answers = load_answers(answers_key, ideas)
+    with span('read categories'):
+        categories_digest = file_digest(extra.F_CATEGORIES)
+        if str(cached.get('categories/digest')) == categories_digest:
+            categories = Categories(zip(
+                unpack(cached['categories/id']),
+                unpack(cached['categories/number']),
+                unpack(cached['categories/category']),
+                unpack(cached['categories/ideas']),
+            ))
+        else:
+            categories = extra.read_categories()
+    with span('read scorings'):
+        scorings, digests = load_scorings(cached, answers_key, all_answers)
+
+    if (
+            str(cached.get('categories/digest')) != categories_digest
+            or str(cached.get('answers_key')) != answers_key
+            or unpack(cached.get('raters/digest', np.array([]))) != list(digests.values())
+    ):
+        with span('write cache'):
+            write_dataset(answers_key, categories_digest, categories, scorings, digests)
+    return all_answers, categories, scorings
+
+
+def load_answers(answers_key, ideas) -> list[Answer]:
+    """The answers with one of the scored `ideas`, from the cache if it has them."""
+    cached = read_npz(F_ANSWERS_CACHE)
+    if str(cached.get('key')) == answers_key:
+        columns = {name: unpack(cached[f'answers/{name}']) for name in Answer.FIELDS}
+        debug(f'Read answers from cache: {F_ANSWERS_CACHE}')
+    else:
+        # Only the scored answers are used, the rest are skipped while reading
+        columns = answers.read_answer_columns(ideas=ideas)
+        write_npz(F_ANSWERS_CACHE, {
+            'key': np.array(answers_key),
+            **{f'answers/{name}': pack(columns[name]) for name in Answer.FIELDS},
+        })
+    all_answers = answers.answers_from_columns(columns)
+    debug(f'Loaded {len(all_answers)} scored answers from {answers.F_ANSWERS}')
+    return all_answers
+
+
+def load_scorings(cached, answers_key, all_answers: list[Answer]):
+    """
+    The scorings of all scoring files, reading only the files changed since
+    they were cached. Returns the scorings and the digests of their files,
+    by rater.
+    """
+    # Cached scorings refer to the answers by position
+    known = {}
+    if str(cached.get('answers_key')) == answers_key:
+        known = dict(zip(unpack(cached.get('raters', np.array([]))), unpack(cached.get('raters/digest', np.array([])))))
+
+    scorings, digests = {}, {}
+    index = None
+    for file_path in D_SCORING.glob('*.csv'):
+        rater = file_path.stem
+        digests[rater] = file_digest(file_path)
+        if known.get(rater) == digests[rater]:
+            scorings[rater] = Scoring(
+                ScoringEntry(all_answers[i].numbered(number), number, original, plausible, effective)
+                for i, number, original, plausible, effective in cached[f'scorings/{rater}'].tolist()
+            )
+        else:
+            if index is None:
+                index = IdeaIndex(all_answers)
+            scorings[rater] = read_scoring(file_path, index)
+    return scorings, digests
+
+
+def write_dataset(answers_key, categories_digest, categories: Categories, scorings: dict[str, Scoring], digests):
+    files = [path for path in input_files() if path in _digests]
+    arrays = {
+        'files/path': pack([str(path) for path in files]),
+        'files/stat': np.array([_digests[path][0] for path in files], dtype=np.int64).reshape(-1, 2),
+        'files/digest': pack([_digests[path][1] for path in files]),
+        'answers_key': np.array(answers_key),
+        'categories/digest': np.array(categories_digest),
+        'categories/id': pack([e.id for e in categories]),
+        'categories/number': np.array([e.number for e in categories], dtype=np.int64),
+        'categories/category': pack([e.category for e in categories]),
+        'categories/ideas': np.array([e.ideas for e in categories], dtype=np.int64),
+        'raters': pack(list(scorings)),
+        'raters/digest': pack([digests[rater] for rater in scorings]),
+    }
+    for rater, scoring in scorings.items():
+        arrays[f'scorings/{rater}'] = np.array(
+            [[s.answer.position, s.number, s.original, s.plausible, s.effective] for s in scoring],
+            dtype=np.int64,
+        ).reshape(-1, 5)
+    write_npz(F_DATASET, arrays)
@@ -9,12 +9,20 @@ F_CATEGORIES = Path('data/category.csv')
 class Categories(list):
     def __init__(self, rows):
         super().__init__(CategoryEntry(r) for r in rows)
+        self._by_id = {}
+        for entry in self:
+            if entry.id in self._by_id:
+                raise ValueError(f'Answer {entry.id} categorized more than once')
+            self._by_id[entry.id] = entry
 
     def __getitem__(self, item) -> 'CategoryEntry':
-        for entry in self:
-            if entry.id == item:
-                return entry
-        raise KeyError(item)
+        return self._by_id[item]
+
+    def __contains__(self, item) -> bool:
+        return item in self._by_id
+
+    def get(self, item, default=None) -> 'CategoryEntry':
+        return self._by_id.get(item, default)
 
     def category_names(self) -> list[str]:
         return sorted({e.category for e in self})
@@ -0,0 +1,11 @@
+# Raters of each scorer group
+AUTHORS = ['pernille', 'trine', 'kristoffer', 'thomas']
+EXPERTS = ['zia', 'monique']
+GROUPS = {
+    'author': AUTHORS,
+    'expert': EXPERTS,
+    'total': AUTHORS + EXPERTS,
+}
+
+# The scoring the raters agreed on together, not an independent rater
+CONSENSUS = 'felles'
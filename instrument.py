@@ -0,0 +1,86 @@
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+
+from utils import *
+
+
+@dataclass
+class Span:
+    name: str
+    # Name of the enclosing span, if any
+    parent: str | None
+    pid: int
+    wall: float = 0.0
+    cpu: float = 0.0
+    # Peak traced memory in bytes, if memory is traced
+    peak: int | None = None
+    # Highest peak seen so far, including finished inner spans
+    _peak_so_far: int = field(default=0, repr=False)
+
+
+# Finished spans of this process, in the order they finished
+SPANS: list[Span] = []
+
+# Spans being timed, innermost last
+_open: list[Span] = []
+
+
+def trace_memory():
+    """Also record peak memory in the spans, at the cost of slower allocations."""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+@contextmanager
+def span(name):
+    """
+    Time the wall and CPU time, and peak memory if traced, of a stage of
+    the run. Spans can be nested.
+    """
+    s = Span(name, _open[-1].name if _open else None, os.getpid())
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        # Peaks are measured per span, so keep the peak of the outer span
+        # before resetting it
+        if _open:
+            _open[-1]._peak_so_far = max(_open[-1]._peak_so_far, tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+
+    _open.append(s)
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield s
+    finally:
+        s.wall = time.perf_counter() - wall
+        s.cpu = time.process_time() - cpu
+        _open.pop()
+        if tracing:
+            s.peak = max(s._peak_so_far, tracemalloc.get_traced_memory()[1])
+            if _open:
+                _open[-1]._peak_so_far = max(_open[-1]._peak_so_far, s.peak)
+        SPANS.append(s)
+        debug(lambda: f'{name}: {s.wall:.3f} s wall, {s.cpu:.3f} s CPU'
+                      + (f', {s.peak / 2 ** 20:.1f} MiB peak' if s.peak is not None else ''))
+
+
+def take_spans() -> list[Span]:
+    """Remove and return the finished spans, e.g. to send them from a worker process."""
+    res = SPANS[:]
+    SPANS.clear()
+    return res
+
+
+def write_profile(path, spans=None, **meta):
+    """Write the spans, and any `meta` data about the run, as JSON."""
+    spans = SPANS if spans is None else spans
+    with open(path, 'w') as f:
+        json.dump({
+            **meta,
+            'memory_traced': tracemalloc.is_tracing(),
+            'spans': [{k: v for k, v in asdict(s).items() if not k.startswith('_')} for s in spans],
+        }, f, indent=2, ensure_ascii=False)
+    debug(f'Wrote profile: {path}')
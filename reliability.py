@@ -0,0 +1,185 @@
+import csv
+import sys
+from dataclasses import dataclass
+from itertools import combinations
+
+import numpy as np
+
+from scoring import RaterTensor
+from significance import SEED, resample_weights
+from utils import *
+
+CRITERIA = ['Originalitet', 'Gjennomførbarhet', 'Potensiell effekt']
+
+# ICC variants of Shrout & Fleiss, single rater and average of k raters
+ICC_VARIANTS = ['ICC1', 'ICC2', 'ICC3', 'ICC1k', 'ICC2k', 'ICC3k']
+
+
+@dataclass
+class Agreement:
+    measure: str
+    criterion: str
+    raters: str
+    # Number of ideas the measure is computed from
+    n: int
+    value: float
+    low: float
+    high: float
+
+
+def icc(scores, weights):
+    """
+    ICC variants of an idea × rater matrix, one row of ICC_VARIANTS per
+    row of `weights`. Only ideas scored by every rater are used.
+
+    `weights` are the number of times each idea is counted, so a bootstrap
+    resample of the ideas is a row of counts and the whole batch is a few
+    matrix products.
+    """
+    complete = ~np.isnan(scores).any(axis=1)
+    y = np.where(complete[:, np.newaxis], scores, 0.0)
+    k = y.shape[1]
+
+    n = weights @ complete
+    total = weights @ y.sum(axis=1)
+    correction = total ** 2 / (n * k)
+    ss_total = weights @ (y ** 2).sum(axis=1) - correction
+    ss_rows = weights @ (y.sum(axis=1) ** 2) / k - correction
+    ss_cols = np.sum((weights @ y) ** 2, axis=1) / n - correction
+
+    ms_rows = ss_rows / (n - 1)
+    ms_cols = ss_cols / (k - 1)
+    ms_within = (ss_total - ss_rows) / (n * (k - 1))
+    ms_error = (ss_total - ss_rows - ss_cols) / ((n - 1) * (k - 1))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.column_stack([
+            (ms_rows - ms_within) / (ms_rows + (k - 1) * ms_within),
+            (ms_rows - ms_error) / (ms_rows + (k - 1) * ms_error + k * (ms_cols - ms_error) / n),
+            (ms_rows - ms_error) / (ms_rows + (k - 1) * ms_error),
+            (ms_rows - ms_within) / ms_rows,
+            (ms_rows - ms_error) / (ms_rows + (ms_cols - ms_error) / n),
+            (ms_rows - ms_error) / ms_rows,
+        ])
+
+
+def alpha_ordinal(codes, n_levels, weights):
+    """
+    Krippendorff's alpha with the ordinal metric, of an idea × rater
+    matrix of level codes (-1 where missing), per row of `weights`.
+    """
+    counts = np.zeros((len(codes), n_levels))
+    rows, cols = np.nonzero(codes >= 0)
+    np.add.at(counts, (rows, codes[rows, cols]), 1)
+
+    # Each idea's pairable values make up its share of the coincidence matrix
+    m = counts.sum(axis=1)
+    pairable = m >= 2
+    share = np.einsum('uc,uk->uck', counts, counts)
+    share[:, np.arange(n_levels), np.arange(n_levels)] -= counts
+    share[pairable] /= (m[pairable] - 1)[:, np.newaxis, np.newaxis]
+    share[~pairable] = 0
+
+    coincidence = (weights @ share.reshape(len(codes), -1)).reshape(-1, n_levels, n_levels)
+    marginals = coincidence.sum(axis=2)
+    n = marginals.sum(axis=1)
+
+    # Ordinal distance between levels c and k is the square of the number of
+    # values between them, counting c and k as half
+    mid = np.cumsum(marginals, axis=1) - marginals / 2
+    delta = (mid[:, :, np.newaxis] - mid[:, np.newaxis, :]) ** 2
+
+    observed = np.sum(coincidence * delta, axis=(1, 2))
+    expected = np.sum(marginals[:, :, np.newaxis] * marginals[:, np.newaxis, :] * delta, axis=(1, 2))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 1 - (n - 1) * observed / expected
+
+
+def kappa_pairs(codes, levels, pairs, weights, chunk_size=2 ** 24):
+    """
+    Cohen's kappa with quadratic weights of each rater pair, over the ideas
+    both have scored, as an array of resamples × pairs.
+
+    `codes` is an idea × rater matrix of indices into `levels` (-1 where
+    missing). Pairs are counted a chunk at a time, keeping the one-hot
+    confusion cells below about `chunk_size` values.
+    """
+    n_ideas = len(codes)
+    n_levels = len(levels)
+    onehot = (codes[:, :, np.newaxis] == np.arange(n_levels)).astype(float)
+
+    levels = np.asarray(levels, dtype=float)
+    disagreement = (levels[:, np.newaxis] - levels[np.newaxis, :]) ** 2
+
+    res = []
+    step = max(1, chunk_size // (n_ideas * n_levels * n_levels))
+    for start in range(0, len(pairs), step):
+        a, b = np.array(pairs[start:start + step]).T
+        cells = onehot[:, a, :, np.newaxis] * onehot[:, b, np.newaxis, :]
+        observed = (weights @ cells.reshape(n_ideas, -1)).reshape(len(weights), len(a), n_levels, n_levels)
+        observed /= observed.sum(axis=(2, 3), keepdims=True)
+        expected = observed.sum(axis=3)[..., np.newaxis] * observed.sum(axis=2)[..., np.newaxis, :]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            res.append(1 - np.sum(observed * disagreement, axis=(2, 3)) / np.sum(expected * disagreement, axis=(2, 3)))
+    return np.hstack(res)
+
+
+def agreement(
+        tensor: RaterTensor,
+        raters: list[str],
+        confidence=0.95,
+        n_resamples=2_000,
+        batch=250,
+        seed=SEED,
+) -> list[Agreement]:
+    """
+    ICC, ordinal Krippendorff's alpha and pairwise weighted Cohen's kappa
+    of the raters in `tensor` (named by `raters`), for each criterion.
+
+    Confidence intervals are percentile bootstraps over the ideas. All
+    measures and criteria share the same resamples, drawn `batch` at a time.
+    """
+    n_raters, n_ideas, n_criteria = tensor.values.shape
+    if n_raters != len(raters):
+        raise ValueError(f'{len(raters)} rater names for {n_raters} raters')
+
+    levels = np.unique(tensor.values[~np.isnan(tensor.values)])
+    codes = np.where(np.isnan(tensor.values), -1, np.searchsorted(levels, tensor.values))
+    pairs = list(combinations(range(n_raters), 2))
+
+    def measures(weights):
+        res = []
+        for c in range(n_criteria):
+            scores = tensor.values[:, :, c].T
+            res += [
+                icc(scores, weights),
+                alpha_ordinal(codes[:, :, c].T, len(levels), weights)[:, np.newaxis],
+                kappa_pairs(codes[:, :, c].T, levels, pairs, weights),
+            ]
+        return np.hstack(res)
+
+    estimate = measures(np.ones((1, n_ideas)))[0]
+    dist = np.vstack([measures(w) for w in resample_weights(n_ideas, n_resamples, batch, seed)])
+    low, high = np.nanquantile(dist, [(1 - confidence) / 2, (1 + confidence) / 2], axis=0)
+
+    scored = ~np.isnan(tensor.values)
+    labels = []
+    for c in range(n_criteria):
+        labels += [(v, c, ', '.join(raters), int(np.sum(scored[:, :, c].all(axis=0)))) for v in ICC_VARIANTS]
+        labels.append(('Krippendorffs alfa (ordinal)', c, ', '.join(raters), int(np.sum(scored[:, :, c].sum(axis=0) >= 2))))
+        labels += [
+            ('Cohens kappa (kvadratisk)', c, f'{raters[a]}, {raters[b]}', int(np.sum(scored[a, :, c] & scored[b, :, c])))
+            for a, b in pairs
+        ]
+
+    return [
+        Agreement(measure, CRITERIA[c], names, n, float(v), float(lo), float(hi))
+        for (measure, c, names, n), v, lo, hi in zip(labels, estimate, low, high)
+    ]
+
+
+def agreement_csv(rows: list[Agreement], fout=sys.stdout):
+    w = csv.writer(fout, delimiter=';')
+    w.writerow(['Mål', 'Kriterium', 'Bedømmere', 'Antall', 'Verdi', 'Nedre', 'Øvre'])
+    for r in rows:
+        w.writerow([r.measure, r.criterion, r.raters, r.n, fmt_num(r.value, w=4), fmt_num(r.low, w=4), fmt_num(r.high, w=4)])
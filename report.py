@@ -0,0 +1,666 @@
+import hashlib
+import statistics
+from functools import partial
+from pprint import pformat
+
+import numpy as np
+from scipy import stats
+
+import analysis
+import answers
+import cache
+import extra
+import reliability
+import robustness
+import significance
+from groups import CONSENSUS, GROUPS
+from instrument import span
+from results import Results, TestResult, correct
+from runner import section
+from scoring import D_SCORING, RaterTensor, Scoring, ScoringEntry, ScoringFrame, read_scoring, scored_ideas
+from utils import *
+
+
+class Data:
+    """
+    Input of the report sections. Everything derived from the loaded
+    answers and scorings is computed on first use.
+    """
+
+    def __init__(self, test='ttest', ci=False, all_subsets=False, jobs=None):
+        # Name of the two-sample test in TESTS used by the t-test sections
+        self.test = test
+        # Whether the scoring CSVs include bootstrap confidence intervals
+        self.ci = ci
+        # Whether the robustness section tries every subset of the raters,
+        # not only leaving out one at a time
+        self.all_subsets = all_subsets
+        # Processes a section may use, or None for the number of CPUs
+        self.jobs = jobs
+
+        info('Reading input data...')
+        # The answers known to Qualtrics with a scored idea.
+        # At this point the answers is lacking categories.
+        # All scorings done by the authors and experts.
+        self.all_answers, self.categories, self.scorings = cache.load_dataset()
+        debug(f'Scorings: {self.scorings.keys()}')
+
+        self._aggregated = {}
+        self._categorized = None
+        self._ratings = None
+        self._tensor = None
+
+    def reload(self, changed):
+        """
+        Reread the changed input files, and forget what is derived from
+        them. A changed answers file reloads the whole dataset.
+        """
+        changed = set(changed)
+        if answers.F_ANSWERS in changed:
+            self.all_answers, self.categories, self.scorings = cache.load_dataset()
+            self.forget(everything=True)
+            return
+
+        raters = sorted(path.stem for path in changed if path.parent == D_SCORING)
+        if raters:
+            index = answers.IdeaIndex(self.all_answers)
+            if scored_ideas() - index.keys() - index.ambiguous:
+                # New ideas are in answers that were skipped when loading
+                debug('Scored ideas not in the loaded answers, reloading the whole dataset')
+                self.all_answers, self.categories, self.scorings = cache.load_dataset()
+                self.forget(everything=True)
+                return
+            for rater in raters:
+                path = D_SCORING / f'{rater}.csv'
+                if path.exists():
+                    self.scorings[rater] = read_scoring(path, index)
+                else:
+                    self.scorings.pop(rater, None)
+
+        if extra.F_CATEGORIES in changed:
+            self.categories = extra.read_categories()
+        self.forget(raters, categories=extra.F_CATEGORIES in changed)
+
+    def forget(self, raters=(), categories=False, everything=False):
+        """
+        Drop the data derived from the scorings of `raters`, and from the
+        categories if set, so it is computed again on next use.
+        """
+        if everything:
+            self._aggregated = {}
+            self._categorized = self._ratings = self._tensor = None
+            return
+
+        raters = set(raters)
+
+        def stale(key):
+            # Digests are cheap, and any of them may cover the changed data
+            if key[0] == 'digest':
+                return True
+            group = CONSENSUS if key[0] == 'self' else key[0]
+            return bool(raters & set(GROUPS.get(group, [group])))
+
+        self._aggregated = {k: v for k, v in self._aggregated.items() if not stale(k)}
+        if raters:
+            self._tensor = None
+        if raters or categories:
+            # The answers to categorize are those of the first scoring
+            self._categorized = None
+
+    def require(self, need: tuple):
+        """Compute the data named by a section need, e.g. ('frame', 'total', 'mean')."""
+        method, *args = need
+        return getattr(self, method)(*args)
+
+    def options(self, names) -> str:
+        """The values of the named options, as they change the outputs of a section."""
+        return ' '.join(f'{name}={getattr(self, name)}' for name in names)
+
+    def digest(self, need: tuple) -> str:
+        """
+        Content hash of the data named by a section need, with the answers
+        file it was read from. Sections are skipped when the digests of all
+        their needs are unchanged.
+        """
+        key = ('digest', *need)
+        if key not in self._aggregated:
+            h = hashlib.sha256(f'{need} {cache.file_digest(answers.F_ANSWERS)}'.encode())
+            value = self.require(need)
+            update_digest(h, value)
+            if need[0] == 'categorized':
+                # Categorizing sets the category and number of ideas of the
+                # answers, and the plots show every category, including
+                # those without answers
+                h.update('\0'.join(f'{a.category} {a.ideas}' for a in value[0]).encode())
+                h.update(repr(self.category_names()).encode())
+            self._aggregated[key] = h.hexdigest()
+        return self._aggregated[key]
+
+    def group_tensor(self, group) -> RaterTensor:
+        """Scores of the raters of a scorer group."""
+        key = (group, 'tensor')
+        if key not in self._aggregated:
+            self._aggregated[key] = RaterTensor(self.scorings[r] for r in GROUPS[group])
+        return self._aggregated[key]
+
+    def aggregate(self, group, kind):
+        """Per idea and criterion, the median or mean score of a scorer group."""
+        key = (group, kind, 'values')
+        if key not in self._aggregated:
+            tensor = self.group_tensor(group)
+            with span(f'aggregate {group} {kind}'):
+                self._aggregated[key] = tensor.median_high() if kind == 'median' else tensor.mean()
+        return self._aggregated[key]
+
+    def scoring(self, group, kind) -> Scoring:
+        """
+        The median or mean scoring of a scorer group, or the scoring of a
+        single rater if `group` isn't one of GROUPS. The sections use the
+        arrays of frame().
+        """
+        key = (group, kind)
+        if key not in self._aggregated:
+            if group not in GROUPS:
+                self._aggregated[key] = self.scorings[group]
+            else:
+                self._aggregated[key] = self.group_tensor(group).scoring(self.aggregate(group, kind))
+        return self._aggregated[key]
+
+    def frame(self, group, kind='mean') -> ScoringFrame:
+        """Like scoring(), as arrays aggregated directly on the rater tensor."""
+        key = (group, kind, 'frame')
+        if key not in self._aggregated:
+            if group not in GROUPS:
+                self._aggregated[key] = self.scorings[group].frame()
+            else:
+                self._aggregated[key] = self.group_tensor(group).frame(self.aggregate(group, kind))
+        return self._aggregated[key]
+
+    def self_frame(self) -> ScoringFrame:
+        """The respondents' own evaluation of their ideas."""
+        key = ('self', 'frame')
+        if key not in self._aggregated:
+            felles = self.scorings['felles']
+            self_evals = Scoring(ScoringEntry.from_answer(s.answer, s.number) for s in felles)
+            self._aggregated[key] = self_evals.frame()
+        return self._aggregated[key]
+
+    def raters(self) -> list[str]:
+        """Names of all the individual raters with a scoring file."""
+        return sorted(name for name in self.scorings if name != CONSENSUS)
+
+    def tensor(self) -> RaterTensor:
+        """Scores of all the individual raters, in the order of raters()."""
+        if self._tensor is None:
+            self._tensor = RaterTensor(self.scorings[r] for r in self.raters())
+        return self._tensor
+
+    def ratings(self) -> answers.Ratings:
+        """Ordinal answer fields of all answers, encoded once."""
+        if self._ratings is None:
+            self._ratings = answers.Ratings(self.all_answers)
+        return self._ratings
+
+    def scored_answers(self):
+        # Use first scoring to determine which answers are relevant
+        for scoring in self.scorings.values():
+            return scoring.answers()
+
+    def category_names(self) -> list[str]:
+        return self.categories.category_names()
+
+    def categorized(self):
+        """
+        All relevant answers, enriched with all necessary data, as
+        (all, with AI, without AI).
+        """
+        if self._categorized is None:
+            categorized_answers = answers.categorize(self.scored_answers(), self.categories)
+            categorized_with_ai = [ans for ans in categorized_answers if ans.used_ai]
+            categorized_without = [ans for ans in categorized_answers if not ans.used_ai]
+            debug(f'Categorized answers: {len(categorized_answers)}')
+            debug(f'With AI: {len(categorized_with_ai)}')
+            debug(f'Without: {len(categorized_without)}')
+            self._categorized = (categorized_answers, categorized_with_ai, categorized_without)
+        return self._categorized
+
+    def categorized_grouped(self):
+        """Relevant answers grouped by category, as (with AI, without AI)."""
+        _, categorized_with_ai, categorized_without = self.categorized()
+
+        with_ai_grouped = {}
+        for ans in categorized_with_ai:
+            with_ai_grouped.setdefault(ans.category, []).append(ans)
+
+        without_grouped = {}
+        for ans in categorized_without:
+            without_grouped.setdefault(ans.category, []).append(ans)
+
+        return with_ai_grouped, without_grouped
+
+
+def update_digest(h, value):
+    """Add the content of a piece of section data to the hash `h`."""
+    if isinstance(value, Scoring):
+        value = value.frame()
+    if isinstance(value, ScoringFrame):
+        for arr in [value.number, value.original, value.plausible, value.effective, value.used_ai, value.position]:
+            h.update(arr.tobytes())
+    elif isinstance(value, RaterTensor):
+        h.update(value.numbers.tobytes())
+        h.update(value.values.tobytes())
+    elif isinstance(value, (list, tuple)) and value and isinstance(value[0], answers.Answer):
+        # Not the category, which is only set on the shared answers once
+        # another section has categorized them
+        h.update('\0'.join(f'{a.id} {a._number} {a._ans_usages}' for a in value).encode())
+    elif isinstance(value, str):
+        h.update(value.encode() + b'\0')
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            update_digest(h, v)
+    # Other data, such as answers.Ratings, is derived from the answers
+    # file alone, which is part of every digest
+
+
+# ------------------------------------------------------------------------------
+#
+# AI vs. uten AI
+# Sammenligning av vurderingskriterier mellom AI og ikke-AI svar.
+#
+# ------------------------------------------------------------------------------
+
+@section(*[('frame', g, k) for g in GROUPS for k in ['median', 'mean']], tags=['scoring'], options=['ci'],
+         outputs=[f'{k}-scoring-{desc}.csv' for desc in ['authors', 'expert', 'total'] for k in ['median', 'mean']])
+def scoring_csvs(d: Data):
+    for group, desc in [('author', 'authors'), ('expert', 'expert'), ('total', 'total')]:
+        for kind in ['median', 'mean']:
+            info(f'Scoring {desc} - {kind}')
+            frame = d.frame(group, kind)
+            with open(outdir / f'{kind}-scoring-{desc}.csv', 'w') as f:
+                analysis.scoring_csv(
+                    with_ai=frame.with_ai(),
+                    without=frame.without_ai(),
+                    fout=f,
+                    ci=d.ci,
+                )
+
+
+# --------------------------------------
+# Weight sensitivity
+# --------------------------------------
+
+@section(('frame', 'total', 'mean'), tags=['sweep'], outputs=['weight-sweep-total.csv', 'weight-sweep-total.png'])
+def weight_sweep(d: Data):
+    info('Weight sensitivity - total mean')
+    frame = d.frame('total')
+    sweep = analysis.WeightSweep(frame.with_ai(), frame.without_ai(), step=.01)
+
+    with open(outdir / 'weight-sweep-total.csv', 'w') as f:
+        sweep.csv(f)
+        debug(f'Wrote CSV: {f.name}')
+
+    sweep.heatmap(
+        name='weight-sweep-total',
+        title='Vekting av totalscore: Med KI vs uten KI (forfattere og eksperter, gjennomsnitt)',
+    )
+
+
+# --------------------------------------
+# Inter-rater reliability
+# --------------------------------------
+
+@section(('tensor',), ('raters',), tags=['reliability'], outputs=['reliability.csv'])
+def rater_agreement(d: Data):
+    info('Inter-rater reliability')
+    rows = reliability.agreement(d.tensor(), d.raters())
+
+    with open(outdir / 'reliability.csv', 'w') as f:
+        reliability.agreement_csv(rows, f)
+        debug(f'Wrote CSV: {f.name}')
+
+
+@section(('tensor',), ('raters',), tags=['robustness'], options=['all_subsets', 'test'],
+         outputs=['robustness.csv'])
+def rater_robustness(d: Data):
+    info('Rater robustness')
+    results = robustness.robustness(d.tensor(), all_subsets=d.all_subsets, test=TESTS[d.test], jobs=d.jobs)
+
+    with open(outdir / 'robustness.csv', 'w') as f:
+        robustness.robustness_csv(results, d.raters(), f)
+        debug(f'Wrote CSV: {f.name}')
+
+    for r in results:
+        if not r.same_conclusion:
+            warn(f'{r.criterion} ({r.aggregate}) changes without {", ".join(d.raters()[i] for i in r.left_out)}')
+
+
+# ------------------------------------------------------------------------------
+#
+# Category Count
+# Counting the answers for each category. Plot the distribution.
+#
+# ------------------------------------------------------------------------------
+
+@section(('categorized',), tags=['plots'], outputs=['kategori-distribusjon.png'])
+def category_distribution(d: Data):
+    info('Category distribution')
+    with_ai_grouped, without_grouped = d.categorized_grouped()
+    with_ai_count = {k: len(g) for k, g in with_ai_grouped.items()}
+    without_count = {k: len(g) for k, g in without_grouped.items()}
+    category_names = d.category_names()
+
+    analysis.bar_plot_compare_ai(
+        name='kategori-distribusjon',
+        values_with_ai=[with_ai_count.get(cat, 0) for cat in category_names],
+        values_without=[without_count.get(cat, 0) for cat in category_names],
+        title='Distribusjon kategori: Med KI vs uten KI',
+        ylabel='Antall',
+        xlabel='Kategorier',
+        xticklabels=category_names,
+    )
+
+
+# ------------------------------------------------------------------------------
+#
+# Category Scoring
+# Plot the scoring per category, for different scorers.
+#
+# ------------------------------------------------------------------------------
+
+@section(('categorized',), ('frame', 'total', 'mean'), tags=['plots'], outputs=['category-original-total.png'])
+def category_originality(d: Data):
+    info('Originality distribution - totals')
+    with_ai_grouped, without_grouped = d.categorized_grouped()
+    total_frame_mean = d.frame('total', 'mean')
+    category_names = d.category_names()
+
+    with_ai_original = {
+        category: total_frame_mean.means(ans.number for ans in answers)[0]
+        for category, answers in with_ai_grouped.items()
+    }
+
+    without_original = {
+        category: total_frame_mean.means(ans.number for ans in answers)[0]
+        for category, answers in without_grouped.items()
+    }
+
+    analysis.scatter_plot(
+        name='category-original-total',
+        line_values=[
+            [with_ai_original.get(cat, None) for cat in category_names],
+            [without_original.get(cat, None) for cat in category_names],
+        ],
+        line_labels=['Med KI', 'Uten KI'],
+        title='Kategori, Originalitet: Med KI vs uten KI (totalt)',
+        ylabel='Antall',
+        xlabel='Kategorier',
+        xticklabels=category_names,
+    )
+
+
+# ------------------------------------------------------------------------------
+#
+# Number of Ideas
+#
+# ------------------------------------------------------------------------------
+
+@section(('categorized',), outputs=['number-of-ideas.txt'])
+def number_of_ideas(d: Data):
+    info('Number of ideas')
+    _, categorized_with_ai, categorized_without = d.categorized()
+
+    cnt_with_ai = 0
+    for ans in categorized_with_ai:
+        cnt_with_ai = cnt_with_ai + ans.ideas
+
+    avg_with_ai = statistics.mean(ans.ideas for ans in categorized_with_ai)
+
+    cnt_without = 0
+    for ans in categorized_without:
+        cnt_without = cnt_without + ans.ideas
+
+    avg_without = statistics.mean(ans.ideas for ans in categorized_without)
+
+    with open(outdir / 'number-of-ideas.txt', 'w') as f:
+        print(f'    With AI   Without', file=f)
+        print(f'Total    {cnt_with_ai:>2}   {cnt_without}', file=f)
+        print(f'Average  {avg_with_ai:>2}   {avg_without:.3}', file=f)
+        debug(f'Wrote text: {f.name}')
+
+
+# ------------------------------------------------------------------------------
+#
+# AI usage in experiment
+#
+# ------------------------------------------------------------------------------
+
+@section(('scored_answers',), tags=['plots'], outputs=['ai-usage.png'])
+def ai_usage(d: Data):
+    info('AI usage in experiment')
+
+    categories = answers.experiment_usages(d.scored_answers())
+
+    analysis.bar_plot_single(
+        name='ai-usage',
+        label='Antall svar',
+        values=[count for (cat, count) in categories],
+        title='Bruk av AI i eksperiment',
+        ylabel='Antall svar',
+        xlabel='Bruksområde',
+        xticklabels=[cat for (cat, count) in categories],
+    )
+
+
+# ------------------------------------------------------------------------------
+#
+# T-Testing
+#
+# ------------------------------------------------------------------------------
+
+def weighted(frame): return frame.total_weighted(.6, .2)
+
+
+# Two-sample tests selectable for the t-test sections
+TESTS = {
+    'ttest': stats.ttest_ind,
+    'permutation': significance.permutation_test,
+}
+
+
+def ttest(a, b, test='ttest'):
+    debug(lambda: f'T-test A ({len(a)}): {pformat(a, width=140, compact=True)}')
+    debug(lambda: f'T-test B ({len(b)}): {pformat(b, width=140, compact=True)}')
+    return TESTS[test](a, b)
+
+
+# Scorer groups of the scoring tests, by label
+SCORING_GROUPS = {
+    'author': 'Forfattere',
+    'expert': 'Eksperter',
+    'total': 'Forfattere og Eksperter',
+    'felles': 'Forfattere Felles',
+    'self': 'Selvevaluering',
+}
+
+
+@section(('categorized',), ('ratings',), ('self_frame',), *[('frame', g) for g in SCORING_GROUPS if g != 'self'],
+         tags=['ttest'], options=['test'], outputs=['t-testing-scoring.csv', 't-testing.csv'])
+def ttests(d: Data):
+    """
+    All the t-tests. Their p-values are corrected as one family before
+    the scoring tests are written to t-testing-scoring.csv and the rest to
+    t-testing.csv.
+    """
+    test = partial(ttest, test=d.test)
+    scoring_results = Results()
+    results = Results()
+
+    ttest_mean_scoring(d, scoring_results, test)
+    ttest_difficulty_evaluation(d, results, test)
+    ttest_number_of_ideas(d, results, test)
+    ttest_answer_category(d, results, test)
+    ttest_timings(d, results, test)
+    ttest_originality(d, results, test)
+    ttest_highlow(d, results)
+
+    correct(scoring_results, results)
+    for name, table in [('t-testing-scoring.csv', scoring_results), ('t-testing.csv', results)]:
+        with open(outdir / name, 'w') as f:
+            table.csv(f)
+            debug(f'Wrote CSV: {f.name}')
+
+
+# --------------------------------------
+# Mean Scoring
+# --------------------------------------
+
+def ttest_mean_scoring(d: Data, results: Results, test):
+    info("T-testing mean scorings")
+    for group, label in SCORING_GROUPS.items():
+        debug(f'{label} T-tests')
+        frame = d.self_frame() if group == 'self' else d.frame(group)
+        results.add(
+            [f'Likt vektet - {label}', f'Vektet 60/20/20 - {label}'],
+            np.column_stack([frame.with_ai().total(), weighted(frame.with_ai())]),
+            np.column_stack([frame.without_ai().total(), weighted(frame.without_ai())]),
+            test,
+        )
+
+
+# --------------------------------------
+# Difficulty Evaluation
+# --------------------------------------
+
+def ttest_difficulty_evaluation(d: Data, results: Results, test):
+    info("T-testing difficulty evaluation")
+    _, categorized_with_ai, categorized_without = d.categorized()
+    ratings = d.ratings()
+    results.add(
+        'Difficulty Evaluation',
+        ratings.codes('difficulty', [ans.position for ans in categorized_with_ai]),
+        ratings.codes('difficulty', [ans.position for ans in categorized_without]),
+        test,
+    )
+
+
+# --------------------------------------
+# Number of Ideas
+# --------------------------------------
+
+def ttest_number_of_ideas(d: Data, results: Results, test):
+    info("T-testing number of ideas")
+    _, categorized_with_ai, categorized_without = d.categorized()
+    results.add(
+        'Number of Ideas',
+        [ans.ideas for ans in categorized_with_ai],
+        [ans.ideas for ans in categorized_without],
+        test,
+    )
+
+
+# --------------------------------------
+# Answer Category
+# --------------------------------------
+
+def ttest_answer_category(d: Data, results: Results, test):
+    info("T-testing answer category")
+    categorized_answers, categorized_with_ai, categorized_without = d.categorized()
+    cats = sorted(set(ans.category for ans in categorized_answers))
+    results.add(
+        'Answer Category',
+        [cats.index(ans.category) for ans in categorized_with_ai],
+        [cats.index(ans.category) for ans in categorized_without],
+        test,
+    )
+
+
+# --------------------------------------
+# Time
+# --------------------------------------
+
+def ttest_timings(d: Data, results: Results, test):
+    info("T-testing time")
+    _, categorized_with_ai, categorized_without = d.categorized()
+
+    debug('T-testing brainstorm and description time')
+    results.add(
+        ['Time Brainstorming', 'Time Description'],
+        [(ans.time_brainstorm, ans.time_description) for ans in categorized_with_ai],
+        [(ans.time_brainstorm, ans.time_description) for ans in categorized_without],
+        test,
+    )
+
+    # Answers with AI taking 12000 seconds or more are left out
+    debug('T-testing effect time')
+    results.add(
+        'Time Effect',
+        [ans.time_effect for ans in categorized_with_ai if ans.time_effect < 12000],
+        [ans.time_effect for ans in categorized_without],
+        test,
+    )
+
+    debug('T-testing total time')
+    results.add(
+        'Time Total',
+        [ans.time_total for ans in categorized_with_ai if ans.time_total < 12000],
+        [ans.time_total for ans in categorized_without],
+        test,
+    )
+
+
+# --------------------------------------
+# Originality
+# --------------------------------------
+
+def ttest_originality(d: Data, results: Results, test):
+    info("T-testing originality")
+    for group, label in [('author', 'Forfattere'), ('expert', 'Eksperter'), ('total', 'Forfattere og eksperter')]:
+        debug(f'T-testing originality {label}')
+        frame = d.frame(group)
+        results.add(
+            f'Originalitet - {label}',
+            frame.with_ai().original,
+            frame.without_ai().original,
+            test,
+        )
+
+
+# --------------------------------------
+# High med/uten
+# --------------------------------------
+
+# Answer attributes compared among the answers ranked highest, by label
+HIGHLOW = {
+    'ai_knowledge': 'AI-kunnskap',
+    'ai_critical': 'AI-kritisk',
+    'ai_use_exploration': 'AI-utforskning',
+    'ai_use_videreutvikling': 'AI-videreutvikling',
+    'ai_use_search': 'AI-søk',
+    'work_usage': 'Bruk på jobb',
+}
+
+
+def ttest_highlow(d: Data, results: Results):
+    info("T-testing high med/uten")
+    total_frame_mean = d.frame('total')
+
+    with span('test high med/uten'):
+        split = analysis.split_tests(
+            total_frame_mean.with_ai(),
+            total_frame_mean.without_ai(),
+            ratings=d.ratings(),
+            attributes=list(HIGHLOW),
+            test=TESTS[d.test],
+        )
+
+    for res in split:
+        results.append(TestResult(
+            test=f'{HIGHLOW[res.attribute]} høy, med vs. uten',
+            group_a='Med KI',
+            group_b='Uten KI',
+            n_a=res.n_with_ai,
+            n_b=res.n_without,
+            statistic=res.statistic,
+            pvalue=res.pvalue,
+            effects=res.effects,
+        ))
@@ -0,0 +1,85 @@
+import csv
+import sys
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from instrument import span
+from significance import CORRECTIONS, EFFECTS, adjust, effect_sizes
+from utils import *
+
+
+@dataclass
+class TestResult:
+    test: str
+    group_a: str
+    group_b: str
+    n_a: int
+    n_b: int
+    statistic: float
+    pvalue: float
+    # Effect sizes of group A - group B, as {effect: (value, low, high)}
+    # by name in significance.EFFECTS
+    effects: dict
+    # Corrected p-values, by method in significance.CORRECTIONS
+    adjusted: dict = field(default_factory=dict)
+
+
+class Results(list):
+    """
+    Two-sample test results, collected in memory so the p-values can be
+    corrected for multiple comparisons before any of them are written.
+    Effect sizes are computed with the test, from the same columns.
+    """
+
+    def add(self, names, a, b, test: Callable, groups=('Med KI', 'Uten KI')):
+        """
+        Test the samples `a` and `b`. 2-D samples are tested column by
+        column in a single call of `test`, with one name per column.
+        """
+        a = np.asarray(a, dtype=float)
+        b = np.asarray(b, dtype=float)
+        names = [names] if isinstance(names, str) else list(names)
+
+        with span(f'test {names[0]}'):
+            res = test(a, b)
+            effects = effect_sizes(a, b)
+        statistic = np.atleast_1d(res.statistic)
+        pvalue = np.atleast_1d(res.pvalue)
+        for j, name in enumerate(names):
+            self.append(TestResult(
+                test=name,
+                group_a=groups[0],
+                group_b=groups[1],
+                n_a=len(a),
+                n_b=len(b),
+                statistic=float(statistic[j]),
+                pvalue=float(pvalue[j]),
+                effects={e: tuple(float(np.atleast_1d(v)[j]) for v in values) for e, values in effects.items()},
+            ))
+
+    def csv(self, fout=sys.stdout):
+        w = csv.writer(fout, delimiter=';')
+        w.writerow([
+            'Test', 'Gruppe A', 'Gruppe B', 'Antall A', 'Antall B', 'Statistikk', 'P-verdi',
+            *CORRECTIONS.values(),
+            *[f'{label}{suffix}' for label in EFFECTS.values() for suffix in ['', ' nedre', ' øvre']],
+        ])
+        for r in self:
+            w.writerow([
+                r.test, r.group_a, r.group_b, r.n_a, r.n_b,
+                fmt_num(r.statistic, w=4),
+                fmt_num(r.pvalue, w=4),
+                *[fmt_num(r.adjusted.get(method, np.nan), w=4) for method in CORRECTIONS],
+                *[fmt_num(v) for e in EFFECTS for v in r.effects[e]],
+            ])
+
+
+def correct(*tables: Results):
+    """Correct the p-values of all the tables as one family of comparisons."""
+    rows = [r for table in tables for r in table]
+    pvalues = np.array([r.pvalue for r in rows])
+    for method in CORRECTIONS:
+        for r, p in zip(rows, adjust(pvalues, method)):
+            r.adjusted[method] = float(p)
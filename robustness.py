@@ -0,0 +1,142 @@
+import csv
+import os
+import sys
+from collections.abc import Callable
+from dataclasses import dataclass
+from itertools import combinations
+
+import numpy as np
+from scipy import stats
+
+from analysis import CRITERIA
+import workers
+from scoring import RaterTensor
+from utils import *
+
+# Aggregates of a rater subset, as RaterTensor methods
+AGGREGATES = {
+    'median': RaterTensor.median_high,
+    'mean': RaterTensor.mean,
+}
+
+# Criteria compared between AI and non-AI answers for every subset
+DESCS = ['Originalitet', 'Gjennomførbarhet', 'Potensiell effekt', 'Total, gjennomsnitt', 'Total, 60/20/20']
+
+
+@dataclass
+class SubsetResult:
+    # Included and left out raters, as indices into the tensor
+    raters: tuple
+    left_out: tuple
+    aggregate: str
+    criterion: str
+    n_with_ai: int
+    n_without: int
+    mean_with_ai: float
+    mean_without: float
+    pvalue: float
+    # Whether the subset agrees with all raters on the direction of the
+    # difference and on it being significant
+    same_conclusion: bool = True
+
+
+def rater_subsets(n_raters, all_subsets=False, min_size=2) -> list[tuple]:
+    """
+    All raters followed by every leave-one-out subset, or by every subset of
+    at least `min_size` raters if `all_subsets`.
+    """
+    everyone = tuple(range(n_raters))
+    if all_subsets:
+        sizes = range(n_raters - 1, min_size - 1, -1)
+    else:
+        sizes = [n_raters - 1] if n_raters - 1 >= min_size else []
+    return [everyone] + [s for size in sizes for s in combinations(everyone, size)]
+
+
+def subset_results(tensor: RaterTensor, raters: tuple, test: Callable = stats.ttest_ind) -> list[SubsetResult]:
+    """AI vs. non-AI results of one subset of the raters, for each aggregate."""
+    sub = tensor.subset(raters)
+    left_out = tuple(r for r in range(len(tensor.values)) if r not in raters)
+
+    res = []
+    for kind, aggregate in AGGREGATES.items():
+        frame = sub.frame(aggregate(sub))
+        frame = frame.filter(~np.isnan(frame.criteria()).any(axis=1))
+        with_ai, without = frame.with_ai(), frame.without_ai()
+
+        a = np.column_stack([CRITERIA[desc](with_ai) for desc in DESCS])
+        b = np.column_stack([CRITERIA[desc](without) for desc in DESCS])
+        pvalues = test(a, b).pvalue if len(a) > 1 and len(b) > 1 else np.full(len(DESCS), np.nan)
+
+        res += [
+            SubsetResult(raters, left_out, kind, desc, len(a), len(b), float(ma), float(mb), float(p))
+            for desc, ma, mb, p in zip(DESCS, a.mean(axis=0), b.mean(axis=0), pvalues)
+        ]
+    return res
+
+
+# Tensor and test of the worker processes
+def _run_in_worker(subsets):
+    tensor, test = workers.shared
+    return [r for raters in subsets for r in subset_results(tensor, raters, test)]
+
+
+def robustness(
+        tensor: RaterTensor,
+        all_subsets=False,
+        test: Callable = stats.ttest_ind,
+        alpha=0.05,
+        jobs=None,
+) -> list[SubsetResult]:
+    """
+    Recompute the AI vs. non-AI comparison with every leave-one-out (or
+    every) subset of the raters in `tensor`, to show which conclusions rest
+    on a single rater.
+
+    Subsets reuse the loaded tensor and are spread over `jobs` processes.
+    The first results are those of all raters; each result is flagged by
+    whether it reaches the same conclusion at significance level `alpha`.
+    """
+    subsets = rater_subsets(len(tensor.values), all_subsets)
+    jobs = min(jobs or os.cpu_count() or 1, len(subsets))
+
+    if jobs == 1:
+        res = [r for raters in subsets for r in subset_results(tensor, raters, test)]
+    else:
+        chunks = [subsets[i::jobs] for i in range(jobs)]
+        debug(f'Robustness: {len(subsets)} rater subsets over {jobs} processes')
+        with workers.fork_pool(jobs, (tensor, test)) as pool:
+            by_subset = {}
+            for r in (r for chunk in pool.map(_run_in_worker, chunks) for r in chunk):
+                by_subset.setdefault(r.raters, []).append(r)
+        res = [r for raters in subsets for r in by_subset[raters]]
+
+    full = {(r.aggregate, r.criterion): r for r in res if not r.left_out}
+    for r in res:
+        ref = full[(r.aggregate, r.criterion)]
+        r.same_conclusion = bool(
+            np.sign(r.mean_with_ai - r.mean_without) == np.sign(ref.mean_with_ai - ref.mean_without)
+            and (r.pvalue < alpha) == (ref.pvalue < alpha)
+        )
+    return res
+
+
+def robustness_csv(results: list[SubsetResult], raters: list[str], fout=sys.stdout):
+    w = csv.writer(fout, delimiter=';')
+    w.writerow([
+        'Bedømmere', 'Utelatt', 'Aggregering', 'Kriterium', 'Antall med KI', 'Antall uten KI',
+        'Gjennomsnitt med KI', 'Gjennomsnitt uten KI', 'P-verdi', 'Samme konklusjon',
+    ])
+    for r in results:
+        w.writerow([
+            ', '.join(raters[i] for i in r.raters),
+            ', '.join(raters[i] for i in r.left_out),
+            r.aggregate,
+            r.criterion,
+            r.n_with_ai,
+            r.n_without,
+            fmt_num(r.mean_with_ai),
+            fmt_num(r.mean_without),
+            fmt_num(r.pvalue, w=4),
+            'Ja' if r.same_conclusion else 'Nei',
+        ])
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+import instrument
+import workers
+from instrument import span
+from utils import *
+
+
+@dataclass
+class Section:
+    name: str
+    fn: Callable
+    # Data the section reads, as (<Data method>, *args) tuples
+    needs: list[tuple]
+    tags: list[str]
+    # Files the section writes to the out folder
+    outputs: list[str]
+    # Data options the outputs depend on, e.g. 'test'
+    options: list[str]
+
+
+# All registered report sections, in report order
+SECTIONS: dict[str, Section] = {}
+
+
+def section(*needs, tags=(), outputs=(), options=()):
+    """
+    Register a report section. `needs` are the data it reads, which are
+    computed before any section runs. `outputs` are the files it writes,
+    so it can be skipped while they and the `options` it uses are up to
+    date.
+    """
+
+    def register(fn):
+        SECTIONS[fn.__name__] = Section(fn.__name__, fn, list(needs), list(tags), list(outputs), list(options))
+        return fn
+
+    return register
+
+
+def select(only=()) -> list[Section]:
+    """
+    Sections matching any of the names or tags in `only`, or all sections
+    if it's empty.
+    """
+    if not only:
+        return list(SECTIONS.values())
+
+    unknown = set(only) - set(SECTIONS) - {t for s in SECTIONS.values() for t in s.tags}
+    if unknown:
+        raise ValueError(f'Unknown sections: {", ".join(sorted(unknown))}')
+    return [s for s in SECTIONS.values() if s.name in only or set(s.tags) & set(only)]
+
+
+# Digests of the sections as of their last run, by section name
+F_MANIFEST = outdir / '.sections.json'
+
+_code_digest = None
+
+
+def code_digest() -> str:
+    """Hash of the source files, so any code change reruns every section."""
+    global _code_digest
+    if _code_digest is None:
+        h = hashlib.sha256()
+        for path in sorted(Path(__file__).parent.glob('*.py')):
+            h.update(path.name.encode())
+            h.update(path.read_bytes())
+        _code_digest = h.hexdigest()
+    return _code_digest
+
+
+def section_digest(data, s: Section) -> str:
+    """Hash of everything the outputs of the section depend on."""
+    h = hashlib.sha256(f'{code_digest()} {s.name} {data.options(s.options)}'.encode())
+    for need in s.needs:
+        h.update(data.digest(need).encode())
+    return h.hexdigest()
+
+
+def read_manifest() -> dict:
+    try:
+        with open(F_MANIFEST) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_manifest(manifest):
+    with open(F_MANIFEST, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+
+def up_to_date(s: Section, digest, manifest) -> bool:
+    return manifest.get(s.name) == digest and all((outdir / name).exists() for name in s.outputs)
+
+
+def _run_in_worker(name):
+    data = workers.shared
+    # The sections already use all the processes, so they run serially
+    data.jobs = 1
+    # The spans are sent back, as the worker's own copy is lost with it
+    instrument.take_spans()
+    with span(f'section {name}'):
+        SECTIONS[name].fn(data)
+    return name, instrument.take_spans()
+
+
+def run(data, sections: list[Section], jobs=None, force=False):
+    """
+    Run the sections on `data`. Everything the sections need is computed
+    first, then the sections run in parallel over `jobs` processes.
+
+    Sections whose code, options and data are unchanged since their last
+    run, and whose outputs still exist, are skipped unless `force` is set.
+    """
+    with span('prepare data'):
+        for s in sections:
+            for need in s.needs:
+                data.require(need)
+        digests = {s.name: section_digest(data, s) for s in sections}
+
+    manifest = read_manifest()
+    if not force:
+        skipped = [s.name for s in sections if up_to_date(s, digests[s.name], manifest)]
+        if skipped:
+            info(f'Up to date: {", ".join(skipped)}')
+        sections = [s for s in sections if s.name not in skipped]
+    # Sections that fail part way must not be taken as up to date later
+    for s in sections:
+        manifest.pop(s.name, None)
+    write_manifest(manifest)
+
+    def done(name):
+        # Written after every section, so an interrupted run keeps what it finished
+        manifest[name] = digests[name]
+        write_manifest(manifest)
+
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(sections) <= 1:
+        for s in sections:
+            with span(f'section {s.name}'):
+                s.fn(data)
+            done(s.name)
+        return
+
+    debug(f'Running {len(sections)} sections over {jobs} processes')
+    with workers.fork_pool(jobs, data) as pool:
+        futures = [pool.submit(_run_in_worker, s.name) for s in sections]
+        for f in futures:
+            name, spans = f.result()
+            instrument.SPANS.extend(spans)
+            done(name)
+            debug(f'Section done: {name}')
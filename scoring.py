@@ -1,10 +1,13 @@
 from collections.abc import Iterable
 from dataclasses import dataclass
 from pathlib import Path
+import copy
 import csv
 import statistics
 
-from answers import Answer
+import numpy as np
+
+from answers import Answer, IdeaIndex
 from utils import debug
 
 D_SCORING = Path('data/scoring/')
@@ -16,24 +19,18 @@ class Scoring(list):
         super().__init__(sorted(rows, key=lambda row: row.number))
 
     @classmethod
-    def from_csv(cls, rows, answers: Iterable[Answer]):
+    def from_csv(cls, rows, answers: IdeaIndex):
         return cls(ScoringEntry.from_csv(row, answers) for row in rows)
 
     @classmethod
     def from_median(cls, lst: Iterable['Scoring']):
-        scoring = [
-            ScoringEntry.from_median(zipped)
-            for zipped in zip(*lst)
-        ]
-        return cls(scoring)
+        tensor = RaterTensor(lst)
+        return tensor.scoring(tensor.median_high())
 
     @classmethod
     def from_mean(cls, lst: Iterable['Scoring']):
-        scoring = [
-            ScoringEntry.from_mean(zipped)
-            for zipped in zip(*lst)
-        ]
-        return cls(scoring)
+        tensor = RaterTensor(lst)
+        return tensor.scoring(tensor.mean())
 
     def find(self, number) -> 'ScoringEntry':
         for score in self:
@@ -41,6 +38,9 @@ class Scoring(list):
                 return score
         raise KeyError(number)
 
+    def frame(self) -> 'ScoringFrame':
+        return ScoringFrame.from_scoring(self)
+
     def with_ai(self) -> 'Scoring':
         return Scoring(s for s in self if s.answer.used_ai)
 
@@ -50,18 +50,6 @@ class Scoring(list):
     def answers(self) -> list[Answer]:
         return [s.answer for s in self]
 
-    def original_mean(self, answers: Iterable[Answer]):
-        nums = [self.find(ans.number).original for ans in answers]
-        return statistics.mean(nums)
-
-    def plausible_mean(self, answers: Iterable[Answer]):
-        nums = [self.find(ans.number).plausible for ans in answers]
-        return statistics.mean(nums)
-
-    def effective_mean(self, answers: Iterable[Answer]):
-        nums = [self.find(ans.number).effective for ans in answers]
-        return statistics.mean(nums)
-
 
 @dataclass
 class ScoringEntry:
@@ -72,7 +60,7 @@ class ScoringEntry:
     effective: float
 
     @classmethod
-    def from_csv(cls, row, answers: Iterable[Answer]):
+    def from_csv(cls, row, answers: IdeaIndex):
         assert len(row) == 15, f'Expected 15 columns in scoring, got {len(row)}'
 
         number = int(row[0])
@@ -81,53 +69,120 @@ class ScoringEntry:
         plausible = int(row[-3])
         effective = int(row[-2])
 
-        for ans in answers:
-            if ans.idea1 == idea1:
-                answer = ans.numbered(number)
-                break
-        else:
-            raise ValueError(f'Idea {number} not found in answers :: {idea1}')
+        if idea1 in answers.ambiguous:
+            raise ValueError(f'Idea {number} matches several answers :: {idea1}')
+        try:
+            answer = answers[idea1].numbered(number)
+        except KeyError:
+            raise ValueError(f'Idea {number} not found in answers :: {idea1}') from None
 
         return cls(answer, number, original, plausible, effective)
 
     @classmethod
-    def from_median(cls, scoring: tuple['ScoringEntry']):
-        answer = scoring[0].answer
-        number = scoring[0].number
-        for s in scoring[1:]:
-            assert s.answer.id == answer.id
-            assert s.number == number
+    def from_answer(cls, answer: Answer, number: int):
+        return cls(
+            answer=answer,
+            number=number,
+            original=answer.original,
+            plausible=answer.plausible,
+            effective=answer.effective,
+        )
 
-        original = statistics.median_high([s.original for s in scoring])
-        plausible = statistics.median_high([s.plausible for s in scoring])
-        effective = statistics.median_high([s.effective for s in scoring])
+    def total(self):
+        return (self.original + self.plausible + self.effective) / 3
 
-        return cls(answer, number, original, plausible, effective)
+    def total_weighted(self, wo, wp):
+        we = 1.0 - wo - wp
+        return self.original * wo + self.plausible * wp + self.effective * we
 
-    @classmethod
-    def from_mean(cls, scoring: tuple['ScoringEntry']):
-        answer = scoring[0].answer
-        number = scoring[0].number
-        for s in scoring[1:]:
-            assert s.answer.id == answer.id
-            assert s.number == number
 
-        original = statistics.mean([s.original for s in scoring])
-        plausible = statistics.mean([s.plausible for s in scoring])
-        effective = statistics.mean([s.effective for s in scoring])
+class ScoringFrame:
+    """
+    Columnar scoring: one NumPy array per field, rows sorted by number.
 
-        return cls(answer, number, original, plausible, effective)
+    The answers are kept in a list shared between a frame and everything
+    filtered from it; `index` points into that list. `position` is each
+    answer's index in the list of all answers, for looking up answer data
+    such as answers.Ratings.
+    """
+
+    def __init__(self, answers: list[Answer], number, index, original, plausible, effective, used_ai, position):
+        self._answers = answers
+        self.number = number
+        self.index = index
+        self.position = position
+        self.original = original
+        self.plausible = plausible
+        self.effective = effective
+        self.used_ai = used_ai
 
     @classmethod
-    def from_answer(cls, answer: Answer, number: int):
+    def from_scoring(cls, scoring: Iterable[ScoringEntry]) -> 'ScoringFrame':
+        scoring = sorted(scoring, key=lambda row: row.number)
+        answers = [s.answer for s in scoring]
+        n = len(scoring)
         return cls(
-            answer=answer,
-            number=number,
-            original=answer.original,
-            plausible=answer.plausible,
-            effective=answer.effective,
+            answers=answers,
+            number=np.fromiter((s.number for s in scoring), dtype=np.int64, count=n),
+            index=np.arange(n),
+            original=np.fromiter((s.original for s in scoring), dtype=np.float64, count=n),
+            plausible=np.fromiter((s.plausible for s in scoring), dtype=np.float64, count=n),
+            effective=np.fromiter((s.effective for s in scoring), dtype=np.float64, count=n),
+            used_ai=np.fromiter((a.used_ai for a in answers), dtype=bool, count=n),
+            position=np.fromiter((a.position for a in answers), dtype=np.int64, count=n),
         )
 
+    @classmethod
+    def of(cls, scoring) -> 'ScoringFrame':
+        """Return `scoring` as a frame, converting it if necessary."""
+        if isinstance(scoring, cls):
+            return scoring
+        return cls.from_scoring(scoring)
+
+    def __len__(self):
+        return len(self.number)
+
+    def filter(self, mask) -> 'ScoringFrame':
+        """Rows selected by a boolean mask or an index array."""
+        return ScoringFrame(
+            answers=self._answers,
+            number=self.number[mask],
+            index=self.index[mask],
+            original=self.original[mask],
+            plausible=self.plausible[mask],
+            effective=self.effective[mask],
+            used_ai=self.used_ai[mask],
+            position=self.position[mask],
+        )
+
+    def with_ai(self) -> 'ScoringFrame':
+        return self.filter(self.used_ai)
+
+    def without_ai(self) -> 'ScoringFrame':
+        return self.filter(~self.used_ai)
+
+    def answers(self) -> list[Answer]:
+        return [self._answers[i] for i in self.index]
+
+    def criteria(self):
+        """The scores as an idea × criterion array (original, plausible, effective)."""
+        return np.column_stack([self.original, self.plausible, self.effective])
+
+    def means(self, numbers: Iterable[int]) -> tuple[float, float, float]:
+        """
+        Mean originality, plausibility and effect of the ideas with the
+        given numbers. Frames are sorted by idea number.
+        """
+        numbers = np.fromiter(numbers, dtype=np.int64)
+        if len(numbers) == 0:
+            raise statistics.StatisticsError('means requires at least one number')
+        rows = np.searchsorted(self.number, numbers)
+        found = rows < len(self)
+        found[found] = self.number[rows[found]] == numbers[found]
+        if not found.all():
+            raise KeyError(f'Ideas not in the frame: {numbers[~found].tolist()}')
+        return tuple(float(v) for v in self.criteria()[rows].mean(axis=0))
+
     def total(self):
         return (self.original + self.plausible + self.effective) / 3
 
@@ -136,21 +191,142 @@ class ScoringEntry:
         return self.original * wo + self.plausible * wp + self.effective * we
 
 
-def read_scorings(answers) -> dict[str, Scoring]:
-    result = {}
+class RaterTensor:
+    """
+    Scores from several raters as a rater × idea × criterion array.
+
+    Raters are aligned by idea number, not by position. Ideas a rater
+    hasn't scored are NaN and left out of the aggregates. The criteria
+    axis is (original, plausible, effective).
+    """
+
+    def __init__(self, scorings: Iterable[Scoring | ScoringFrame]):
+        frames = [ScoringFrame.of(s) for s in scorings]
+        if not frames:
+            raise ValueError('At least one scoring is required')
+
+        self.numbers = np.unique(np.concatenate([f.number for f in frames]))
+        self.values = np.full((len(frames), len(self.numbers), 3), np.nan)
+        answers = np.full(len(self.numbers), None, dtype=object)
+
+        for r, frame in enumerate(frames):
+            cols = np.searchsorted(self.numbers, frame.number)
+            self.values[r, cols, 0] = frame.original
+            self.values[r, cols, 1] = frame.plausible
+            self.values[r, cols, 2] = frame.effective
+
+            frame_answers = np.empty(len(frame), dtype=object)
+            frame_answers[:] = frame.answers()
+            known = answers[cols]
+            unset = known == None
+            answers[cols[unset]] = frame_answers[unset]
+            # Raters read together share the answer objects, so only other
+            # objects need their ids compared
+            filled = np.flatnonzero(~unset)
+            for i in filled[known[filled] != frame_answers[filled]]:
+                if known[i].id != frame_answers[i].id:
+                    raise ValueError(
+                        f'Idea {frame.number[i]} refers to different answers: '
+                        f'{known[i].id} and {frame_answers[i].id}'
+                    )
+
+        self.answers = list(answers)
+        debug(f'Rater tensor: {len(frames)} raters, {len(self.numbers)} ideas')
+
+    def subset(self, raters) -> 'RaterTensor':
+        """Tensor of only the rater rows `raters`, sharing the ideas."""
+        res = copy.copy(self)
+        res.values = self.values[list(raters)]
+        return res
+
+    def _counts(self):
+        return np.sum(~np.isnan(self.values), axis=0)
+
+    def median_high(self):
+        """Per idea and criterion, the high median over the raters."""
+        ordered = np.sort(self.values, axis=0)  # NaN sorts last
+        idx = (self._counts() // 2)[np.newaxis]
+        return np.take_along_axis(ordered, idx, axis=0)[0]
+
+    def mean(self):
+        return np.nanmean(self.values, axis=0)
+
+    def trimmed_mean(self, proportion=0.1):
+        """
+        Mean after cutting `proportion` of the scores from each end,
+        counted per idea among the raters who scored it.
+        """
+        ordered = np.sort(self.values, axis=0)
+        n = self._counts()
+        k = np.floor(n * proportion).astype(int)
+        rank = np.arange(len(ordered))[:, np.newaxis, np.newaxis]
+        keep = (rank >= k) & (rank < n - k)
+        return np.sum(np.where(keep, ordered, 0.0), axis=0) / np.sum(keep, axis=0)
+
+    def quantile(self, q, method='linear'):
+        return np.nanquantile(self.values, q, axis=0, method=method)
+
+    def frame(self, values) -> ScoringFrame:
+        """Frame of the ideas, scored with an idea × criterion array."""
+        return ScoringFrame(
+            answers=self.answers,
+            number=self.numbers,
+            index=np.arange(len(self.numbers)),
+            original=values[:, 0],
+            plausible=values[:, 1],
+            effective=values[:, 2],
+            used_ai=np.fromiter((a.used_ai for a in self.answers), dtype=bool, count=len(self.answers)),
+            position=np.fromiter((a.position for a in self.answers), dtype=np.int64, count=len(self.answers)),
+        )
+
+    def scoring(self, values) -> Scoring:
+        """Scoring of the ideas, scored with an idea × criterion array."""
+        return Scoring(
+            ScoringEntry(answer, int(number), *map(float, row))
+            for answer, number, row in zip(self.answers, self.numbers, values)
+        )
+
 
+def scored_ideas() -> set[str]:
+    """
+    First idea texts of the ideas in all scoring files, to read only the
+    scored answers.
+    """
+    res = set()
     for file_path in D_SCORING.glob('*.csv'):
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                rd = csv.reader(f, delimiter=';')
+        with open(file_path, 'r', encoding='utf-8') as f:
+            rd = csv.reader(f, delimiter=';')
+
+            # Skip the header row
+            next(rd)
 
-                # Skip the header row
-                next(rd)
+            res.update(row[1] for row in rd if len(row) > 1)
+    return res
+
+
+def read_scorings(answers: Iterable[Answer]) -> dict[str, Scoring]:
+    result = {}
 
-                scoring = Scoring.from_csv(rd, answers)
-                result[file_path.stem] = scoring
-                debug(f'Read {len(scoring)} scorings from {file_path}')
-        except Exception as e:
-            raise Exception(f'Error parsing {file_path}: {e}') from e
+    # Shared by all scoring files, built once
+    index = IdeaIndex(answers)
+
+    for file_path in D_SCORING.glob('*.csv'):
+        result[file_path.stem] = read_scoring(file_path, index)
 
     return result
+
+
+def read_scoring(file_path, index: IdeaIndex) -> Scoring:
+    """Read the scoring file of one rater."""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            rd = csv.reader(f, delimiter=';')
+
+            # Skip the header row
+            next(rd)
+
+            scoring = Scoring.from_csv(rd, index)
+            debug(f'Read {len(scoring)} scorings from {file_path}')
+            return scoring
+    except Exception as e:
+        raise Exception(f'Error parsing {file_path}: {e}') from e
@@ -0,0 +1,244 @@
+import numpy as np
+from scipy import sparse, stats
+
+from utils import SEED
+
+# Statistics comparable by the permutation test
+STATISTICS = {
+    'mean': np.mean,
+    'median': np.median,
+}
+
+
+def permutation_test(a, b, statistic='mean', n_resamples=20_000, batch=2_000, seed=SEED):
+    """
+    Two-sided permutation test of the difference in `statistic` between
+    the samples `a` and `b`.
+
+    The label shuffles are evaluated `batch` at a time as NumPy arrays,
+    which bounds memory to about batch × (len(a) + len(b)) values. 2-D
+    samples are tested column by column, sharing the same shuffles.
+
+    Returns a result with `statistic` and `pvalue`, like `ttest_ind`.
+    """
+    fn = STATISTICS[statistic]
+
+    def diff(x, y, axis):
+        return fn(x, axis=axis) - fn(y, axis=axis)
+
+    return stats.permutation_test(
+        (np.asarray(a, dtype=float), np.asarray(b, dtype=float)),
+        diff,
+        vectorized=True,
+        n_resamples=n_resamples,
+        batch=batch,
+        axis=0,
+        rng=np.random.default_rng(seed),
+    )
+
+
+def resample_weights(n, n_resamples, batch, seed):
+    """Bootstrap resamples of n items as rows of counts, `batch` rows at a time."""
+    rng = np.random.default_rng(seed)
+    for start in range(0, n_resamples, batch):
+        m = min(batch, n_resamples - start)
+        # Counting drawn indices is several times faster than rng.multinomial
+        drawn = rng.integers(0, n, (m, n)) + n * np.arange(m)[:, np.newaxis]
+        yield np.bincount(drawn.ravel(), minlength=m * n).reshape(m, n)
+
+
+def distinct_values(x) -> list[tuple]:
+    """
+    The distinct values of each column of `x` (n × k), sorted, with a
+    sparse distinct × n matrix marking the value of each item.
+    """
+    res = []
+    for column in x.T:
+        values, inverse = np.unique(column, return_inverse=True)
+        indicator = sparse.csr_array(
+            (np.ones(len(column), dtype=np.float32), (inverse, np.arange(len(column)))),
+            shape=(len(values), len(column)),
+        )
+        res.append((values, indicator))
+    return res
+
+
+def resampled_statistics(x, distinct, weights, statistics) -> dict:
+    """
+    Statistics of each column of `x` (n × k) in the resamples given as
+    rows of counts, with the `distinct` values of x.
+    """
+    n = len(x)
+    res = {}
+    if 'mean' in statistics:
+        res['mean'] = weights @ x / n
+    if 'median' in statistics:
+        # The middle items of a resample have the first distinct values where
+        # the cumulative count reaches half of the items. Each resample counts
+        # n items, so the cumulative count over all of them is sorted, and
+        # that of resample i starts at i × n.
+        rows = np.arange(len(weights))
+        # Counts are exact in float32, which halves the memory traffic
+        transposed = np.ascontiguousarray(weights.T, dtype=np.float32)
+        median = np.empty((len(weights), x.shape[1]))
+        for j, (values, indicator) in enumerate(distinct):
+            counts = np.cumsum((indicator @ transposed).T, dtype=float)
+            low = np.searchsorted(counts, rows * n + (n + 1) // 2) - rows * len(values)
+            high = np.searchsorted(counts, rows * n + n // 2 + 1) - rows * len(values)
+            median[:, j] = (values[low] + values[high]) / 2
+        res['median'] = median
+    return res
+
+
+def bootstrap_ci(a, b, statistics=('mean', 'median'), confidence=0.95, n_resamples=5_000, batch=250, seed=SEED):
+    """
+    Percentile bootstrap confidence intervals of each statistic of the
+    samples `a` and `b`, and of their difference (a - b).
+
+    Resamples are drawn as matrices of counts, `batch` at a time, and
+    shared by all statistics: means are a matrix product and medians are
+    read from the resampled counts of the distinct values. 2-D samples get intervals per column
+    from the same resampled rows, so several criteria cost one pass.
+
+    Returns {statistic: (ci_a, ci_b, ci_diff)}, where each interval is an
+    array of (low, high), per column for 2-D samples.
+    """
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    columns_a, columns_b = a.reshape(len(a), -1), b.reshape(len(b), -1)
+    distinct_a, distinct_b = distinct_values(columns_a), distinct_values(columns_b)
+
+    dist_a = {s: [] for s in statistics}
+    dist_b = {s: [] for s in statistics}
+    for weights_a, weights_b in zip(
+            resample_weights(len(a), n_resamples, batch, seed),
+            resample_weights(len(b), n_resamples, batch, seed + 1),
+    ):
+        for dist, values in [
+            (dist_a, resampled_statistics(columns_a, distinct_a, weights_a, statistics)),
+            (dist_b, resampled_statistics(columns_b, distinct_b, weights_b, statistics)),
+        ]:
+            for s in statistics:
+                dist[s].append(values[s])
+
+    q = [(1 - confidence) / 2, (1 + confidence) / 2]
+    res = {}
+    for s in statistics:
+        da = np.concatenate(dist_a[s]).reshape(-1, *a.shape[1:])
+        db = np.concatenate(dist_b[s]).reshape(-1, *b.shape[1:])
+        res[s] = (
+            np.quantile(da, q, axis=0),
+            np.quantile(db, q, axis=0),
+            np.quantile(da - db, q, axis=0),
+        )
+    return res
+
+
+def adjust(pvalues, method='holm'):
+    """
+    P-values corrected for multiple comparisons with one of CORRECTIONS.
+    NaN p-values are kept and don't count as comparisons.
+    """
+    p = np.asarray(pvalues, dtype=float)
+    res = np.full(p.shape, np.nan)
+    tested = ~np.isnan(p)
+    m = np.sum(tested)
+    if m == 0:
+        return res
+
+    order = np.argsort(p[tested])
+    ranked = p[tested][order]
+    if method == 'bonferroni':
+        adjusted = ranked * m
+    elif method == 'holm':
+        adjusted = np.maximum.accumulate(ranked * (m - np.arange(m)))
+    elif method == 'bh':
+        adjusted = np.minimum.accumulate((ranked * m / np.arange(1, m + 1))[::-1])[::-1]
+    else:
+        raise ValueError(f'Unknown correction: {method}')
+
+    unsorted = np.empty(m)
+    unsorted[order] = np.minimum(adjusted, 1)
+    res[tested] = unsorted
+    return res
+
+
+# Multiple comparison corrections of adjust(), by name in the reports
+CORRECTIONS = {
+    'holm': 'Holm',
+    'bh': 'Benjamini-Hochberg',
+    'bonferroni': 'Bonferroni',
+}
+
+
+# Effect sizes of effect_sizes(), by name in the reports
+EFFECTS = {
+    'cohens_d': 'Cohens d',
+    'hedges_g': 'Hedges g',
+    'cliffs_delta': 'Cliffs delta',
+    'rank_biserial': 'Rang-biserial',
+}
+
+
+def _dominance(a, b):
+    """
+    Cliff's dominance summaries of the 1-D samples a and b: the mean sign
+    of a_i - b over b for each a_i, the mean sign of a - b_j over a for
+    each b_j, and the number of tied pairs. Counted on the sorted samples.
+    """
+    sa, sb = np.sort(a), np.sort(b)
+    below_a, above_a = np.searchsorted(sb, a, 'left'), len(b) - np.searchsorted(sb, a, 'right')
+    below_b, above_b = np.searchsorted(sa, b, 'left'), len(a) - np.searchsorted(sa, b, 'right')
+    ties = len(a) * len(b) - np.sum(below_a + above_a)
+    return (below_a - above_a) / len(b), (above_b - below_b) / len(a), ties
+
+
+def effect_sizes(a, b, confidence=0.95):
+    """
+    Cohen's d, Hedges' g, Cliff's delta and the rank-biserial correlation
+    of a - b, with confidence intervals.
+
+    The intervals are analytic: the normal approximation of Hedges & Olkin
+    for d and g, and Cliff's consistent variance with his asymmetric
+    interval for delta. The cost is a sort of each sample column, with no
+    resampling. 2-D samples get effect sizes per column.
+
+    Returns {effect: (value, low, high)}, arrays per column for 2-D
+    samples.
+    """
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    shape = a.shape[1:]
+    a = a.reshape(len(a), -1)
+    b = b.reshape(len(b), -1)
+    na, nb = len(a), len(b)
+    z = stats.norm.ppf((1 + confidence) / 2)
+
+    pooled = ((na - 1) * np.var(a, axis=0, ddof=1) + (nb - 1) * np.var(b, axis=0, ddof=1)) / (na + nb - 2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d = (np.mean(a, axis=0) - np.mean(b, axis=0)) / np.sqrt(pooled)
+    se = np.sqrt((na + nb) / (na * nb) + d ** 2 / (2 * (na + nb)))
+    correction = 1 - 3 / (4 * (na + nb) - 9)
+
+    delta = np.empty(a.shape[1])
+    var = np.empty(a.shape[1])
+    for j in range(a.shape[1]):
+        dom_a, dom_b, ties = _dominance(a[:, j], b[:, j])
+        delta[j] = np.mean(dom_a)
+        pairs = na * nb - ties - na * nb * delta[j] ** 2
+        var[j] = (nb ** 2 * np.sum((dom_a - delta[j]) ** 2) + na ** 2 * np.sum((dom_b - delta[j]) ** 2) - pairs) \
+            / (na * nb * (na - 1) * (nb - 1))
+    var = np.maximum(var, (1 - delta ** 2) / (na * nb - 1))
+    half = z * np.sqrt(var) * np.sqrt((1 - delta ** 2) ** 2 + z ** 2 * var)
+    denom = 1 - delta ** 2 + z ** 2 * var
+    delta_ci = ((delta - delta ** 3 - half) / denom, (delta - delta ** 3 + half) / denom)
+
+    res = {
+        'cohens_d': (d, d - z * se, d + z * se),
+        'hedges_g': (d * correction, (d - z * se) * correction, (d + z * se) * correction),
+        'cliffs_delta': (delta, *delta_ci),
+        # For two independent samples the rank-biserial correlation is
+        # the same as Cliff's delta
+        'rank_biserial': (delta, *delta_ci),
+    }
+    return {e: tuple(np.reshape(v, shape) for v in values) for e, values in res.items()}
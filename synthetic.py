@@ -0,0 +1,185 @@
+import csv
+import json
+from pathlib import Path
+
+import numpy as np
+
+from answers import AI_USE_SCALE, DEGREE_SCALE, F_ANSWERS, SCALES
+from extra import F_CATEGORIES
+from groups import AUTHORS, CONSENSUS, EXPERTS
+from scoring import D_SCORING
+from utils import SEED
+
+# Parameters of the generated dataset, written next to it
+F_MANIFEST = Path('data/synthetic.json')
+
+# Columns of the experiment questions, (without AI, with AI). Each group
+# answers the experiment in its own block of columns.
+EXPERIMENT_COLUMNS = {
+    'ideas': (19, 53),
+    'time_brainstorm': (26, 60),
+    'time_description': (32, 66),
+    'time_effect': (39, 73),
+    'original': (41, 75),
+    'plausible': (42, 76),
+    'effective': (43, 77),
+    'difficulty': (44, 78),
+    'usages': (46, 79),
+}
+
+CATEGORIES = ['Prosess', 'Produkt', 'Kunde', 'Organisasjon', 'Teknologi', 'Bærekraft']
+USAGES = ['Idémyldring', 'Tekstforbedring', 'Søk', 'Oppsummering', 'Annet']
+DIFFICULTY = list(SCALES['difficulty'])
+WORDS = ['digital', 'kunde', 'løsning', 'tjeneste', 'data', 'automatisering', 'samarbeid', 'læring',
+         'plattform', 'deling', 'innsikt', 'energi', 'mobil', 'sensor', 'rådgivning', 'verktøy']
+
+# Rows written to the answers file at a time
+CHUNK_ROWS = 50_000
+
+
+def rater_names(n) -> list[str]:
+    """The report's own raters first, then numbered extra raters."""
+    known = AUTHORS + EXPERTS
+    return known[:n] + [f'rater{i:03d}' for i in range(len(known) + 1, n + 1)]
+
+
+def generate(root, answers=1_000, raters=6, scored=0.8, ai_effect=0.2, seed=SEED):
+    """
+    Write a synthetic dataset below `root`, laid out like the data folder:
+    a 104-column answers export, the categories and a scoring file for
+    each of `raters` raters plus the consensus scoring.
+
+    `scored` of the answers are finished and scored, the rest are left
+    half-filled like abandoned responses. Scores are a latent quality per
+    idea and criterion, raised by `ai_effect` with AI, plus a bias and
+    noise per rater, so the raters agree to a realistic degree.
+    """
+    root = Path(root)
+    rng = np.random.default_rng(seed)
+    (root / D_SCORING).mkdir(parents=True, exist_ok=True)
+
+    n_scored = int(answers * scored)
+    used_ai = rng.random(n_scored) < 0.5
+    quality = rng.normal(3.0, 0.7, (n_scored, 3)) + ai_effect * used_ai[:, np.newaxis]
+
+    write_answers(root / F_ANSWERS, rng, answers, used_ai)
+
+    with open(root / F_CATEGORIES, 'w', encoding='utf-8', newline='') as f:
+        w = csv.writer(f, delimiter=';')
+        w.writerow(['id', 'number', 'category', 'ideas'])
+        w.writerows(zip(
+            response_ids(np.arange(n_scored)),
+            range(1, n_scored + 1),
+            rng.choice(CATEGORIES, n_scored).tolist(),
+            rng.integers(1, 6, n_scored).tolist(),
+        ))
+
+    names = rater_names(raters)
+    scores = np.stack([
+        quality + rng.normal(0, 0.3) + rng.normal(0, 0.8, quality.shape)
+        for _ in names
+    ])
+    scores = np.clip(np.rint(scores), 1, 5).astype(int)
+    consensus = np.clip(np.rint(np.median(scores, axis=0)), 1, 5).astype(int)
+    ideas = [idea_text(i, 0) for i in range(n_scored)]
+
+    for name, rater_scores in zip(names + [CONSENSUS], [*scores, consensus]):
+        with open(root / D_SCORING / f'{name}.csv', 'w', encoding='utf-8', newline='') as f:
+            w = csv.writer(f, delimiter=';')
+            w.writerow(['Nr', 'Idé', *[''] * 9, 'Originalitet', 'Gjennomførbarhet', 'Potensiell effekt', ''])
+            w.writerows(
+                [number, idea, *[''] * 9, *row, '']
+                for number, idea, row in zip(range(1, n_scored + 1), ideas, rater_scores.tolist())
+            )
+
+    with open(root / F_MANIFEST, 'w') as f:
+        json.dump({'answers': answers, 'raters': raters, 'scored': scored, 'ai_effect': ai_effect, 'seed': seed}, f)
+
+
+def response_ids(numbers) -> list[str]:
+    return [f'R_{n:015d}' for n in numbers]
+
+
+def idea_text(answer, idea) -> str:
+    # Unique per answer and idea, so every scored idea finds its answer
+    return f'Idé {answer}.{idea}: {WORDS[(answer + idea) % len(WORDS)]} {WORDS[(answer * 7 + idea) % len(WORDS)]}'
+
+
+def write_answers(path, rng, answers, used_ai):
+    """Write the answers export, the scored answers first."""
+    n_scored = len(used_ai)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        w = csv.writer(f, delimiter=';')
+        # Qualtrics has a row of column ids and a row of question texts
+        w.writerow([f'Q{i}' for i in range(104)])
+        w.writerow([f'Spørsmål {i}' for i in range(104)])
+
+        for start in range(0, answers, CHUNK_ROWS):
+            numbers = np.arange(start, min(start + CHUNK_ROWS, answers))
+            finished = numbers < n_scored
+            ai = np.zeros(len(numbers), dtype=bool)
+            ai[finished] = used_ai[numbers[finished]]
+            w.writerows(answer_rows(rng, numbers, finished, ai))
+
+
+def answer_rows(rng, numbers, finished, ai):
+    n = len(numbers)
+
+    def dates():
+        month, day = rng.integers(1, 13, n), rng.integers(1, 29, n)
+        hour, minute = rng.integers(0, 24, n), rng.integers(0, 60, n)
+        return [f'{mo}/{d}/25 {h}:{mi:02d}' for mo, d, h, mi in zip(month, day, hour, minute)]
+
+    def seconds():
+        return [f'{s:.3f}'.replace('.', ',') for s in rng.gamma(2.0, 120.0, n)]
+
+    def choice(levels):
+        return rng.choice(list(levels), n).tolist()
+
+    cols = {
+        0: dates(),
+        4: np.where(finished, 100, rng.integers(1, 100, n)).tolist(),
+        5: rng.integers(60, 3600, n).tolist(),
+        6: np.where(finished, 'True', '').tolist(),
+        8: response_ids(numbers),
+        83: choice(DEGREE_SCALE),
+        86: choice(AI_USE_SCALE),
+        87: choice(AI_USE_SCALE),
+        88: choice(AI_USE_SCALE),
+        91: choice(['', 'Ingen', 'Litt', 'Mye']),
+        92: choice(['', 'Dårligere', 'Lik', 'Bedre']),
+        93: choice(DEGREE_SCALE),
+        95: choice(SCALES['ai_knowledge']),
+        96: choice(['', 'Ja', 'Nei']),
+        97: choice(['18-29', '30-39', '40-49', '50-59', '60+']),
+        98: choice(['0-5', '6-10', '11-20', '20+']),
+        99: choice(['Kvinne', 'Mann', 'Annet']),
+        100: choice(['IT', 'Økonomi', 'Salg', 'Drift']),
+        101: choice(['Videregående', 'Bachelor', 'Master', 'Doktorgrad']),
+        102: choice(['Leder', 'Rådgiver', 'Utvikler', 'Annet']),
+        103: np.where(ai, 'AI', 'Uten AI').tolist(),
+    }
+    cols[1] = cols[7] = cols[0]
+
+    experiment = {
+        'time_brainstorm': seconds(),
+        'time_description': seconds(),
+        'time_effect': seconds(),
+        'original': rng.integers(1, 6, n).tolist(),
+        'plausible': rng.integers(1, 6, n).tolist(),
+        'effective': rng.integers(1, 6, n).tolist(),
+        'difficulty': choice(DIFFICULTY),
+        'usages': [','.join(rng.choice(USAGES, 2, replace=False)) for _ in range(n)],
+    }
+
+    for i, number in enumerate(numbers.tolist()):
+        row = [''] * 104
+        for c, values in cols.items():
+            row[c] = values[i]
+        if finished[i]:
+            block = int(ai[i])
+            start = EXPERIMENT_COLUMNS['ideas'][block]
+            row[start:start + 5] = [idea_text(number, k) for k in range(5)]
+            for name, values in experiment.items():
+                row[EXPERIMENT_COLUMNS[name][block]] = values[i]
+        yield row
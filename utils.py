@@ -4,25 +4,45 @@ from click import echo, secho
 
 outdir = Path('out')
 
+# Seed of the random generators, so resampled results are reproducible
+SEED = 2025
+
+# Log levels, lowest first. Messages below the current level are dropped.
+LEVELS = ['debug', 'info', 'warn', 'err']
+_level = 0
+
+
+def set_level(name):
+    global _level
+    _level = LEVELS.index(name)
+
+
+def _text(msg):
+    # A callable message is only formatted when it is written
+    return msg() if callable(msg) else msg
+
 
 def debug(msg):
     """Write a debug message to stderr"""
-    secho(f'[ ] {msg}', dim=True, err=True)
+    if _level <= 0:
+        secho(f'[ ] {_text(msg)}', dim=True, err=True)
 
 
 def info(msg):
     """Write an info message to stderr"""
-    echo(f'[*] {msg}', err=True)
+    if _level <= 1:
+        echo(f'[*] {_text(msg)}', err=True)
 
 
 def warn(msg):
     """Write a warning message to stderr"""
-    secho(f'[!] {msg}', fg='yellow', err=True)
+    if _level <= 2:
+        secho(f'[!] {_text(msg)}', fg='yellow', err=True)
 
 
 def err(msg):
     """Write an error message to stderr"""
-    secho(f'[!] {msg}', fg='red', err=True)
+    secho(f'[!] {_text(msg)}', fg='red', err=True)
 
 
 def fmt_num(num, w=2):
@@ -0,0 +1,68 @@
+import time
+from pathlib import Path
+
+import instrument
+import runner
+from cache import input_files
+from instrument import span
+from utils import *
+
+
+def snapshot() -> dict[Path, tuple]:
+    """Modification time and size of each input file."""
+    res = {}
+    for path in input_files():
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            continue
+        res[path] = (st.st_mtime_ns, st.st_size)
+    return res
+
+
+def changed_files(before, after) -> set[Path]:
+    """Files added, removed or modified between two snapshots."""
+    return {path for path in before.keys() | after.keys() if before.get(path) != after.get(path)}
+
+
+def watch(data, sections, jobs=None, interval=.5):
+    """
+    Run the sections, then poll the input files every `interval` seconds.
+    Changed files are reloaded into `data` and the sections rerun, which
+    skips those whose data is unchanged. Runs until interrupted.
+    """
+    runner.run(data, sections, jobs=jobs)
+    instrument.take_spans()
+    seen = snapshot()
+    # Files changed since the last successful reload
+    pending = set()
+    info(f'Watching {len(seen)} input files, stop with Ctrl-C')
+
+    while True:
+        time.sleep(interval)
+        current = snapshot()
+        changed = changed_files(seen, current)
+        if not changed:
+            continue
+
+        # Wait for the files to be completely written before reading them
+        time.sleep(interval)
+        current = snapshot()
+        changed |= changed_files(seen, current)
+        seen = current
+        info(f'Changed: {", ".join(sorted(str(p) for p in changed))}')
+
+        pending |= changed
+        try:
+            with span('rerun') as s:
+                with span('reload'):
+                    data.reload(pending)
+                pending.clear()
+                runner.run(data, sections, jobs=jobs)
+            info(f'Done in {s.wall:.2f} s')
+        except Exception as e:
+            # An analyst may save a file half done, so keep watching for the
+            # fix and read the failed files again with the next change
+            err(f'Failed: {e}')
+        # Nothing reads the spans, so don't let them pile up
+        instrument.take_spans()
@@ -0,0 +1,20 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Data shared with this process by the pool that started it, if any
+shared = None
+
+
+def _init_worker(data):
+    global shared
+    shared = data
+
+
+def fork_pool(jobs, data) -> ProcessPoolExecutor:
+    """
+    A pool of `jobs` processes, each with `data` as `workers.shared`.
+    Forked workers share the data without pickling it.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    ctx = multiprocessing.get_context('fork' if 'fork' in methods else None)
+    return ProcessPoolExecutor(jobs, mp_context=ctx, initializer=_init_worker, initargs=(data,))